@@ -0,0 +1,285 @@
+import argparse
+import cells
+import display
+import json
+import louis
+import navigation
+import os
+import pagination
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+tables = [b'./en-ueb-g2.ctb']
+# en-ueb-g2.ctb has no hyphenation patterns, hyphenate needs the dictionary pagination adds
+hyphenTables = tables + pagination.hyphenation
+# ucBrl (64) combined with noUndefined (128), same as touchtype.py
+mode = louis.ucBrl | louis.noUndefined
+# modes compared by the translation benchmarks
+modes = {'grade2': mode, 'noContractions': mode | louis.noContractions}
+dispSize = 10
+
+words = ['the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog', 'and', 'with', 'file', 'menu', 'open', 'save', 'knowledge', 'braille']
+
+def lines(count, width=8):
+    # short menu/listing style lines built from a fixed vocabulary
+    for i in range(count):
+        yield ' '.join(words[(i + j) % len(words)] for j in range(width))
+
+def corpus(name):
+    # synthetic inputs: a list of strings, each one translated by a single call
+    if name == 'keystroke':
+        return [c for c in 'the quick brown fox jumps over the lazy dog' * 10]
+    if name == 'line':
+        return list(lines(500))
+    if name == 'book':
+        # about 400k characters in paragraphs of 20 lines
+        text = list(lines(8000))
+        return ['\n'.join(text[i:i + 20]) for i in range(0, len(text), 20)]
+    raise ValueError('unknown corpus %r' % name)
+
+corpora = ['keystroke', 'line', 'book']
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+def result(name, times, calls, chars, **extra):
+    fastest = min(times)
+    entry = {
+        'name': name,
+        'calls': calls,
+        'chars': chars,
+        'best_s': fastest,
+        'mean_s': sum(times) / len(times),
+        'per_call_us': fastest / calls * 1e6 if calls else 0.0,
+        'chars_per_s': chars / fastest if fastest else 0.0,
+    }
+    entry.update(extra)
+    return entry
+
+def benchTranslation(repeat):
+    louis.checkTable(tables)
+    results = []
+    for corpusName in corpora:
+        texts = corpus(corpusName)
+        chars = sum(len(text) for text in texts)
+        for modeName, modeValue in modes.items():
+            braille = [louis.translateString(tables, text, mode=modeValue) for text in texts]
+            calls = {
+                'translateString': lambda: [louis.translateString(tables, text, mode=modeValue) for text in texts],
+                'translate': lambda: [louis.translate(tables, text, mode=modeValue) for text in texts],
+                'backTranslateString': lambda: [louis.backTranslateString(tables, text, mode=modeValue) for text in braille],
+            }
+            for name, func in calls.items():
+                results.append(result(name, measure(func, repeat), len(texts), chars, corpus=corpusName, mode=modeName))
+        dots = [louis.charToDots(tables, text, mode=mode) for text in texts]
+        calls = {
+            'charToDots': lambda: [louis.charToDots(tables, text, mode=mode) for text in texts],
+            'dotsToChar': lambda: [louis.dotsToChar(tables, text) for text in dots],
+        }
+        for name, func in calls.items():
+            results.append(result(name, measure(func, repeat), len(texts), chars, corpus=corpusName))
+    hyphenWords = words * 20
+    try:
+        louis.hyphenate(hyphenTables, hyphenWords[0])
+    except RuntimeError:
+        print('hyphenate skipped, %s has no hyphenation dictionary' % b','.join(hyphenTables).decode(), file=sys.stderr)
+        return results
+    results.append(result('hyphenate', measure(lambda: [louis.hyphenate(hyphenTables, word) for word in hyphenWords], repeat), len(hyphenWords), sum(len(word) for word in hyphenWords)))
+    return results
+
+def benchBatch(repeat, count=5000):
+    texts = list(lines(count))
+    chars = sum(len(text) for text in texts)
+    louis.checkTable(tables)
+    return [
+        result('translateString loop', measure(lambda: [louis.translateString(tables, text, mode=mode) for text in texts], repeat), count, chars),
+        result('translateMany', measure(lambda: louis.translateMany(tables, texts, mode=mode), repeat), count, chars),
+        result('charToDots loop', measure(lambda: [louis.charToDots(tables, text, mode=mode) for text in texts], repeat), count, chars),
+        result('charToDotsMany', measure(lambda: louis.charToDotsMany(tables, texts, mode=mode), repeat), count, chars),
+    ]
+
+def benchMasks(repeat, count=1000000):
+    # book-length run of cells, no liblouis needed
+    text = ''.join(chr(cells.brailleBase + (i * 37) % 256) for i in range(count))
+    masks = cells.toMasks(text)
+    return [
+        result('toMasks per character', measure(lambda: bytes([ord(c) - cells.brailleBase for c in text]), repeat), 1, count),
+        result('toMasks', measure(lambda: cells.toMasks(text), repeat), 1, count),
+        result('fromMasks per character', measure(lambda: ''.join([chr(cells.brailleBase + m) for m in masks]), repeat), 1, count),
+        result('fromMasks', measure(lambda: cells.fromMasks(masks), repeat), 1, count),
+    ]
+
+def benchPaging(repeat):
+    # paginating a book into display pages as touchtype does, and paging through all of it onto
+    # a simulated display
+    results = []
+    text = '\n'.join(lines(8000))
+    translator = louis.Translator(tables, mode=mode)
+    for contracted in (False, True):
+        results.append(result('paginate', measure(lambda: pagination.PageIndex(translator, text, dispSize, contracted), repeat),
+                              1, len(text), mode='grade2' if contracted else 'charToDots'))
+    pages = pagination.PageIndex(translator, text, dispSize, True)
+    def page():
+        writer = display.FrameWriter(display.MemoryDisplay(dispSize))
+        events = navigation.SyntheticEvents(['n'] * len(pages))
+        navigation.Navigator(pages, writer.show, events).run()
+    results.append(result('paging', measure(page, repeat), len(pages), len(text)))
+    return results
+
+def benchStress(repeat, rounds=5, threads=4):
+    # translations on several threads while another thread keeps changing the tables and the log
+    # settings, the output has to stay the same as a single threaded run
+    # the entry compiled is for a character not in the corpus, so it doesn't change the output
+    texts = list(lines(2000))
+    chars = sum(len(text) for text in texts)
+    expected = louis.translateMany(tables, texts, mode)
+    results = []
+    translator = louis.Translator(tables, mode=mode)
+    stop = threading.Event()
+    changes = [0]
+    def change():
+        while not stop.is_set():
+            translator.compileString('always \\x2603 1346')
+            louis.setLogLevel(louis.LOG_WARN)
+            louis.registerLogCallback(None)
+            changes[0] += 1
+    changer = threading.Thread(target=change)
+    changer.start()
+    mismatches = [0]
+    def translate():
+        for _ in range(rounds):
+            if translator.translateMany(texts) != expected:
+                mismatches[0] += 1
+    def check():
+        workers = [threading.Thread(target=translate) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    try:
+        times = measure(check, repeat)
+    finally:
+        stop.set()
+        changer.join()
+    if mismatches[0]:
+        raise RuntimeError('%d of %d concurrent runs differed from the single threaded output' % (mismatches[0], threads * rounds * repeat))
+    results.append(result('stress translateMany', times, threads * len(texts) * rounds, threads * chars * rounds, workers=threads, table_changes=changes[0]))
+    return results
+
+# startup scripts, each run in a fresh interpreter; the first cell ones quit right after the first page
+# the text on stdin is a short one, except for 'book' runs
+startupScripts = {
+    'interpreter': 'pass',
+    'import louis': 'import louis',
+    'load liblouis': 'import louis; louis.charSize()',
+    'import touchtype': 'import touchtype',
+    'first cell': 'import navigation, touchtype\n'
+                  'touchtype.displayName = "memory"\n'
+                  'touchtype.keyEvents = lambda: navigation.SyntheticEvents([])\n'
+                  'touchtype.init()\n'
+                  'touchtype.input()',
+    'first cell, compiled': 'import navigation, sys, touchtype\n'
+                            'touchtype.displayName = "memory"\n'
+                            'touchtype.keyEvents = lambda: navigation.SyntheticEvents([])\n'
+                            'touchtype.init(False)\n'
+                            'touchtype.openDocument(sys.argv[1])',
+}
+
+def benchStartup(repeat):
+    # cold start of a new process, as the tool is spawned on devices: interpreter, imports,
+    # and the time until the first page of a short text, or of a compiled book, is on the display
+    import document
+    here = os.path.dirname(os.path.abspath(__file__))
+    text = '\n'.join(lines(20)) + '\n'
+    book = '\n'.join(lines(8000))
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        compiled = os.path.join(directory, 'book.ttdoc')
+        document.build(pagination.PageIndex(louis.Translator(tables, mode=mode), book, dispSize, False), compiled)
+        runs = [(name, script, text) for name, script in startupScripts.items()]
+        runs.append(('first cell, book', startupScripts['first cell'], book))
+        for name, script, stdin in runs:
+            def run():
+                subprocess.run([sys.executable, '-c', script, compiled], cwd=here, input=stdin.encode(), stdout=subprocess.DEVNULL, check=True)
+            results.append(result(name, measure(run, repeat), 1, 0))
+    return results
+
+benchmarks = {
+    'translation': benchTranslation,
+    'batch': benchBatch,
+    'masks': benchMasks,
+    'paging': benchPaging,
+    'stress': benchStress,
+    'startup': benchStartup,
+}
+
+def environment():
+    return {
+        'liblouis': louis.version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'tables': [table.decode() if isinstance(table, bytes) else table for table in tables],
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+def label(entry):
+    parts = [str(entry[key]) for key in ('corpus', 'mode') if key in entry]
+    if 'workers' in entry:
+        parts.append('%d threads' % entry['workers'])
+    return ' '.join(parts)
+
+def report(results):
+    for entry in results:
+        print('%-24s %-22s %10.3f ms  %10.2f us/call  %12.0f chars/s' % (entry['name'], label(entry), entry['best_s'] * 1000, entry['per_call_us'], entry['chars_per_s']))
+
+def key(entry):
+    return tuple(entry.get(field) for field in ('benchmark', 'name', 'corpus', 'mode', 'workers'))
+
+def compare(results, baseline):
+    # change in best time against an earlier JSON run, positive is slower
+    with open(baseline) as f:
+        previous = {key(entry): entry for entry in json.load(f)['results']}
+    for entry in results:
+        old = previous.get(key(entry))
+        if old:
+            print('%-24s %-22s %+8.1f%%' % (entry['name'], label(entry), (entry['best_s'] / old['best_s'] - 1) * 100))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the translation and display hot paths.')
+    parser.add_argument('names', nargs='*', metavar='name', help='benchmarks to run, all of them by default: %s' % ', '.join(benchmarks))
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement')
+    parser.add_argument('--json', metavar='FILE', help="write the results as JSON, '-' for stdout")
+    parser.add_argument('--baseline', metavar='FILE', help='compare against the JSON results of an earlier run')
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in benchmarks:
+            parser.error('unknown benchmark %r' % name)
+    results = []
+    for name in args.names or benchmarks:
+        for entry in benchmarks[name](args.repeat):
+            entry['benchmark'] = name
+            results.append(entry)
+    if args.json:
+        data = json.dumps({'environment': environment(), 'results': results}, indent=2)
+        if args.json == '-':
+            print(data)
+        else:
+            with open(args.json, 'w') as f:
+                f.write(data + '\n')
+    else:
+        report(results)
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == '__main__':
+    main()
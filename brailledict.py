@@ -0,0 +1,277 @@
+import argparse
+import collections
+import hashlib
+import louis
+import mappedfile
+import os
+import re
+import struct
+import sys
+
+# on-disk word -> braille dictionary, built ahead of time from a word list or corpus
+# layout: a mappedfile header, then count + 1 key offsets, count + 1 value offsets (uint32, native byte order),
+# the sorted UTF-8 keys and their UTF-8 translations
+magic = b'TTDICT1\0'
+formatVersion = 1
+# only plain lowercase words are stored, capitals and digits change the translation around them
+wordPattern = re.compile(r'[a-z]+')
+
+def libraryPrefixes():
+    # install prefixes liblouis may have been built with: the one of the loaded library first,
+    # e.g. /usr for /usr/lib/x86_64-linux-gnu/liblouis.so.20, then the usual ones
+    prefixes = []
+    louis.version()
+    try:
+        with open('/proc/self/maps') as f:
+            libraries = [line.split()[-1] for line in f if '/liblouis.so' in line]
+    except OSError:
+        libraries = []
+    for library in libraries[:1]:
+        directory = os.path.dirname(library)
+        while os.path.dirname(directory) != directory:
+            parent = os.path.dirname(directory)
+            if os.path.basename(directory).startswith('lib'):
+                prefixes.append(parent)
+                break
+            directory = parent
+    for prefix in (sys.prefix, '/usr/local', '/usr'):
+        if prefix not in prefixes:
+            prefixes.append(prefix)
+    return prefixes
+
+def tablePath():
+    # where liblouis looks for tables that aren't next to the including table: LOUIS_TABLEPATH,
+    # then the tables directory it was installed with
+    paths = [entry for entry in os.environ.get('LOUIS_TABLEPATH', '').split(',') if entry]
+    paths.extend(os.path.join(prefix, 'share', 'liblouis', 'tables') for prefix in libraryPrefixes())
+    return paths
+
+def findTable(name, including=None, searchPath=None):
+    # the file liblouis would load for a table: for an include next to the including table,
+    # for a table given directly relative to the working directory, then on the search path
+    # raises FileNotFoundError if there is none, a table that can't be found can't be hashed
+    searchPath = tablePath() if searchPath is None else searchPath
+    first = os.path.join(os.path.dirname(including), name) if including else name
+    for path in [first] + [os.path.join(entry, name) for entry in searchPath]:
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    raise FileNotFoundError('table %s%s not found, searched %s' % (
+        name, ' included from %s' % including if including else '', ', '.join([os.path.dirname(first) or '.'] + searchPath)))
+
+def tableFiles(tables):
+    # every table file the tables load, through include lines, in the order liblouis reads them
+    searchPath = tablePath()
+    files = []
+    pending = [(table.decode() if isinstance(table, bytes) else table, None) for table in tables]
+    while pending:
+        name, including = pending.pop(0)
+        path = findTable(name, including, searchPath)
+        if path in files:
+            continue
+        files.append(path)
+        with open(path, 'rb') as f:
+            for line in f.read().decode('utf-8', 'replace').splitlines():
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'include':
+                    pending.append((fields[1], path))
+    return files
+
+def tablesHash(tables, mode):
+    # hash of the liblouis version, the mode and the contents of every table file reachable
+    # through include lines
+    digest = hashlib.sha256()
+    digest.update(louis.version().encode())
+    digest.update(b'mode %d\n' % mode)
+    for path in tableFiles(tables):
+        digest.update(b'table %s\n' % os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def corpusWords(lines, minCount=1, maxWords=None):
+    # the most frequent plain lowercase words of a corpus, a word list is a corpus of one word per line
+    counts = collections.Counter()
+    for line in lines:
+        for token in line.split():
+            if wordPattern.fullmatch(token):
+                counts[token] += 1
+    words = [word for word, count in counts.most_common(maxWords) if count >= minCount]
+    return sorted(words)
+
+def contextFree(translator, word, space):
+    # a word is only stored if it translates the same next to spaces and itself as on its own,
+    # so serving it from the dictionary can't change the output
+    cells = translator.translateString(word)
+    return (translator.translateString(word + ' ' + word) == cells + space + cells
+            and translator.translateString(' ' + word + ' ') == space + cells + space), cells
+
+def build(translator, words, path):
+    # writes the dictionary for translator's tables and mode, returns the number of words stored
+    space = translator.translateString(' ')
+    entries = []
+    for word in sorted(set(words)):
+        ok, cells = contextFree(translator, word, space)
+        if ok:
+            entries.append((word.encode('utf-8'), cells.encode('utf-8')))
+    header = {
+        'version': formatVersion,
+        'tables': tablesHash(translator.tableList, translator.mode),
+        'mode': translator.mode,
+        'count': len(entries),
+        'space': space,
+    }
+    keyOffsets = [0]
+    valueOffsets = [0]
+    for key, value in entries:
+        keyOffsets.append(keyOffsets[-1] + len(key))
+        valueOffsets.append(valueOffsets[-1] + len(value))
+    mappedfile.write(path, magic, header, [
+        struct.pack('=%dI' % len(keyOffsets), *keyOffsets),
+        struct.pack('=%dI' % len(valueOffsets), *valueOffsets),
+        b''.join(key for key, _ in entries),
+        b''.join(value for _, value in entries),
+    ])
+    return len(entries)
+
+class WordDictionary:
+    # read-only, memory-mapped view of a dictionary file
+    def __init__(self, path):
+        self.map, self.header, offset = mappedfile.read(path, magic, formatVersion, 'braille dictionary')
+        self.count = self.header['count']
+        view = memoryview(self.map)
+        self.keyOffsets = view[offset:offset + 4 * (self.count + 1)].cast('I')
+        offset += 4 * (self.count + 1)
+        self.valueOffsets = view[offset:offset + 4 * (self.count + 1)].cast('I')
+        offset += 4 * (self.count + 1)
+        self.keysStart = offset
+        self.valuesStart = offset + self.keyOffsets[self.count]
+
+    def __len__(self):
+        return self.count
+
+    def key(self, i):
+        return self.map[self.keysStart + self.keyOffsets[i]:self.keysStart + self.keyOffsets[i + 1]]
+
+    def get(self, word):
+        # binary search over the sorted keys, None for words not in the dictionary
+        key = word.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.key(low) == key:
+            return self.map[self.valuesStart + self.valueOffsets[low]:self.valuesStart + self.valueOffsets[low + 1]].decode('utf-8')
+        return None
+
+    def matches(self, translator):
+        return (self.header['tables'] == tablesHash(translator.tableList, translator.mode)
+                and self.header['mode'] == translator.mode)
+
+    def close(self):
+        self.keyOffsets.release()
+        self.valueOffsets.release()
+        self.map.close()
+
+class DictionaryTranslator:
+    # translateString that serves stored words from the dictionary and the rest from liblouis
+    # falls back to liblouis for everything if the dictionary is missing or out of date
+    def __init__(self, translator, path):
+        self.translator = translator
+        self.dictionary = None
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            dictionary = WordDictionary(path)
+            if dictionary.matches(translator):
+                self.dictionary = dictionary
+                self.space = dictionary.header['space']
+            else:
+                dictionary.close()
+
+    def translateString(self, text):
+        if self.dictionary is None:
+            return self.translator.translateString(text)
+        # split at single spaces, runs of words not in the dictionary go to liblouis together
+        out = []
+        pending = []
+        first = True
+        for token in text.split(' '):
+            cells = self.dictionary.get(token) if wordPattern.fullmatch(token) else None
+            if cells is None:
+                pending.append(token)
+                self.misses += 1
+                continue
+            self.hits += 1
+            if pending:
+                if not first:
+                    out.append(self.space)
+                out.append(self.translator.translateString(' '.join(pending)))
+                pending = []
+                first = False
+            if not first:
+                out.append(self.space)
+            out.append(cells)
+            first = False
+        if pending:
+            if not first:
+                out.append(self.space)
+            out.append(self.translator.translateString(' '.join(pending)))
+        return ''.join(out)
+
+def verify(dictionaryTranslator, lines):
+    # lines where the dictionary output differs from liblouis
+    translator = dictionaryTranslator.translator
+    return [line for line in lines if dictionaryTranslator.translateString(line) != translator.translateString(line)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and check memory-mapped word to braille dictionaries.')
+    parser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    parser.add_argument('--mode', type=int, default=louis.ucBrl | louis.noUndefined, help='translation mode')
+    commands = parser.add_subparsers(dest='command', required=True)
+    buildParser = commands.add_parser('build', help='pre-translate the words of a word list or corpus')
+    buildParser.add_argument('dictionary')
+    buildParser.add_argument('files', nargs='*', help='word lists or text, stdin by default')
+    buildParser.add_argument('--min-count', type=int, default=1, help='skip words seen fewer times')
+    buildParser.add_argument('--max-words', type=int, help='keep only this many of the most frequent words')
+    checkParser = commands.add_parser('check', help='check that a dictionary matches the current tables')
+    checkParser.add_argument('dictionary')
+    verifyParser = commands.add_parser('verify', help='compare dictionary output with liblouis on some text')
+    verifyParser.add_argument('dictionary')
+    verifyParser.add_argument('files', nargs='*', help='text, stdin by default')
+    args = parser.parse_args()
+    translator = louis.Translator(args.tables.encode().split(b','), mode=args.mode)
+
+    def lines(files):
+        if not files:
+            yield from sys.stdin
+            return
+        for name in files:
+            with open(name, encoding='utf-8') as f:
+                yield from f
+
+    if args.command == 'build':
+        words = corpusWords(lines(args.files), args.min_count, args.max_words)
+        count = build(translator, words, args.dictionary)
+        print('%d of %d words stored in %s' % (count, len(words), args.dictionary))
+    elif args.command == 'check':
+        dictionary = WordDictionary(args.dictionary)
+        if not dictionary.matches(translator):
+            print('%s is out of date for these tables, rebuild it' % args.dictionary)
+            sys.exit(1)
+        print('%s: %d words, up to date' % (args.dictionary, len(dictionary)))
+    elif args.command == 'verify':
+        dictionaryTranslator = DictionaryTranslator(translator, args.dictionary)
+        if dictionaryTranslator.dictionary is None:
+            print('%s is missing or out of date' % args.dictionary)
+            sys.exit(1)
+        mismatches = verify(dictionaryTranslator, (line.rstrip('\n') for line in lines(args.files)))
+        for line in mismatches:
+            print('mismatch: %r' % line)
+        print('%d mismatches, %d dictionary hits, %d misses' % (len(mismatches), dictionaryTranslator.hits, dictionaryTranslator.misses))
+        sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
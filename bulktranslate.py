@@ -0,0 +1,203 @@
+import argparse
+import cells
+import collections
+import louis
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# translates whole books ahead of time: the input is split at blank lines into chunks of
+# paragraphs, the chunks are translated in a process pool and written out again in order
+tables = [b'./en-ueb-g2.ctb']
+mode = louis.ucBrl | louis.noUndefined
+# characters of input per chunk handed to a worker
+chunkSize = 64 * 1024
+# chunks in flight per worker, bounds the memory held by results waiting to be written
+queueDepth = 4
+
+# each worker process builds its translator once, in the pool initializer
+worker = None
+
+def initWorker(tableList, translationMode, outputFormat, width):
+    global worker
+    worker = (louis.Translator(tableList, mode=translationMode), outputFormat, width)
+
+def paragraphs(lines):
+    # paragraphs of a text with their lines joined by spaces, blank lines separate paragraphs
+    paragraph = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            yield ' '.join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield ' '.join(paragraph)
+
+def chunks(lines, size=chunkSize):
+    # lists of whole paragraphs with about size characters each
+    chunk = []
+    length = 0
+    for paragraph in paragraphs(lines):
+        chunk.append(paragraph)
+        length += len(paragraph)
+        if length >= size:
+            yield chunk
+            chunk = []
+            length = 0
+    if chunk:
+        yield chunk
+
+def wrap(text, width, blank):
+    # breaks a translated paragraph into lines of at most width cells at blank cells,
+    # words longer than a line are split
+    if not width:
+        return [text]
+    lines = []
+    line = ''
+    for word in text.split(blank):
+        while len(word) > width:
+            if line:
+                lines.append(line)
+                line = ''
+            lines.append(word[:width])
+            word = word[width:]
+        if not line:
+            line = word
+        elif len(line) + 1 + len(word) <= width:
+            line = line + blank + word
+        else:
+            lines.append(line)
+            line = word
+    lines.append(line)
+    return lines
+
+def translateChunk(chunk):
+    # runs in a worker: the lines of every paragraph of chunk, ready to be written
+    translator, outputFormat, width = worker
+    out = []
+    for braille in translator.translateMany(chunk):
+        if outputFormat == 'brf':
+            out.append(wrap(cells.toAscii(braille), width, ' '))
+        else:
+            out.append(wrap(braille, width, chr(cells.brailleBase)))
+    return out
+
+class Writer:
+    # writes paragraphs separated by blank lines, BRF output is split into pages with form feeds
+    def __init__(self, f, outputFormat, pageLines):
+        self.f = f
+        self.newline = '\r\n' if outputFormat == 'brf' else '\n'
+        self.pageLines = pageLines if outputFormat == 'brf' else 0
+        self.line = 0
+        self.pages = 1
+
+    def writeLine(self, text):
+        if self.pageLines and self.line == self.pageLines:
+            self.f.write('\f')
+            self.pages += 1
+            self.line = 0
+        self.f.write(text + self.newline)
+        self.line += 1
+
+    def writeParagraph(self, lines):
+        # no blank line at the top of a page
+        if self.line:
+            self.writeLine('')
+        for line in lines:
+            self.writeLine(line)
+
+def peakMemory():
+    # peak resident set size in bytes of this process and of its largest finished child
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+def translateFile(source, output, jobs, outputFormat='unicode', width=40, pageLines=25, tableList=tables, translationMode=mode, progress=None):
+    # translates the open text file source into output, returns (characters, paragraphs, pages)
+    # progress(characters) is called after each chunk is written
+    writer = Writer(output, outputFormat, pageLines)
+    characters = 0
+    count = 0
+    if jobs == 1:
+        initWorker(tableList, translationMode, outputFormat, width)
+        for chunk in chunks(source):
+            for lines in translateChunk(chunk):
+                writer.writeParagraph(lines)
+            characters += sum(len(paragraph) for paragraph in chunk)
+            count += len(chunk)
+            if progress:
+                progress(characters)
+        return characters, count, writer.pages
+    with multiprocessing.Pool(jobs, initWorker, (tableList, translationMode, outputFormat, width)) as pool:
+        # Pool.imap would read the whole input ahead, a bounded window of async results keeps
+        # reading, translating and writing in step and the output in input order
+        pending = collections.deque()
+        def writeFirst():
+            result, chunkCharacters, chunkParagraphs = pending.popleft()
+            for lines in result.get():
+                writer.writeParagraph(lines)
+            return chunkCharacters, chunkParagraphs
+        for chunk in chunks(source):
+            pending.append((pool.apply_async(translateChunk, (chunk,)), sum(len(paragraph) for paragraph in chunk), len(chunk)))
+            if len(pending) >= jobs * queueDepth:
+                chunkCharacters, chunkParagraphs = writeFirst()
+                characters += chunkCharacters
+                count += chunkParagraphs
+                if progress:
+                    progress(characters)
+        while pending:
+            chunkCharacters, chunkParagraphs = writeFirst()
+            characters += chunkCharacters
+            count += chunkParagraphs
+            if progress:
+                progress(characters)
+        pool.close()
+        pool.join()
+    return characters, count, writer.pages
+
+def main():
+    parser = argparse.ArgumentParser(description='Translate large text files to braille in parallel.')
+    parser.add_argument('input', help="text file, '-' for stdin")
+    parser.add_argument('output', help='braille file, BRF for .brf names and Unicode braille otherwise')
+    parser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    parser.add_argument('--mode', type=int, default=mode, help='translation mode, must include ucBrl')
+    parser.add_argument('--format', choices=('brf', 'unicode'), help='output format instead of guessing from the name')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--width', type=int, default=40, help='cells per line, 0 to keep paragraphs on one line')
+    parser.add_argument('--page-lines', type=int, default=25, help='lines per BRF page, 0 for no page breaks')
+    parser.add_argument('--quiet', action='store_true', help='no progress report')
+    args = parser.parse_args()
+    if not args.mode & louis.ucBrl:
+        parser.error('--mode must include ucBrl (%d)' % louis.ucBrl)
+    outputFormat = args.format or ('brf' if args.output.lower().endswith('.brf') else 'unicode')
+    total = os.path.getsize(args.input) if args.input != '-' else 0
+    start = time.perf_counter()
+
+    def progress(characters):
+        elapsed = time.perf_counter() - start
+        done = ' %3.0f%%' % min(100.0, characters * 100.0 / total) if total else ''
+        sys.stderr.write('\r%d characters%s, %.0f characters/s' % (characters, done, characters / elapsed if elapsed else 0.0))
+        sys.stderr.flush()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    try:
+        with open(args.output, 'w', encoding='ascii' if outputFormat == 'brf' else 'utf-8', errors='replace', newline='') as output:
+            characters, count, pages = translateFile(source, output, args.jobs, outputFormat, args.width, args.page_lines,
+                                                     args.tables.encode().split(b','), args.mode, None if args.quiet else progress)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    elapsed = time.perf_counter() - start
+    own, child = peakMemory()
+    if not args.quiet:
+        sys.stderr.write('\n')
+    print('%d characters in %d paragraphs to %s (%s, %d pages) in %.2f s with %d jobs, %.0f characters/s' % (
+        characters, count, args.output, outputFormat, pages, elapsed, args.jobs, characters / elapsed if elapsed else 0.0))
+    print('peak memory: %.1f MiB main process, %.1f MiB largest worker' % (own / 1048576.0, child / 1048576.0))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from array import array
+
+# Unicode braille patterns start at U+2800, the low byte of the code point is the dot mask
+# bit 0 is dot 1 and so on up to bit 7 for dot 8
+brailleBase = 0x2800
+brailleHigh = brailleBase >> 8
+
+def toMasks(cells):
+    # turns a string of Unicode braille cells into one dot mask byte per cell
+    # in UTF-16-LE every cell is its mask byte followed by 0x28, so this is two slices in C
+    data = cells.encode('utf_16_le')
+    if data[1::2].strip(bytes([brailleHigh])):
+        raise ValueError('not a string of Unicode braille cells: %r' % cells)
+    return data[0::2]
+
+def toMaskArray(cells):
+    return array('B', toMasks(cells))
+
+def toNumpy(cells):
+    # numpy is optional, only needed by drivers that want a uint8 array
+    import numpy
+    return numpy.frombuffer(toMasks(cells), dtype=numpy.uint8)
+
+def fromMasks(masks):
+    # the reverse of toMasks, from any bytes-like sequence of dot masks
+    masks = memoryview(masks).cast('B')
+    data = bytearray(len(masks) * 2)
+    data[0::2] = masks
+    data[1::2] = bytes([brailleHigh]) * len(masks)
+    return data.decode('utf_16_le')
+
+# North American ASCII braille, as used in BRF files, indexed by the mask of dots 1 to 6
+asciiBraille = ' A1B\'K2L@CIF/MSP"E3H9O6R^DJG>NTQ,*5<-U8V.%[$+X!&;:4\\0Z7(_?W]#Y)='
+# maps every Unicode braille cell to its ASCII braille character, dots 7 and 8 are dropped
+asciiTable = {brailleBase + mask: asciiBraille[mask & 0x3f] for mask in range(256)}
+
+def toAscii(cells):
+    return cells.translate(asciiTable)
+
+def dotsToMask(dots):
+    # a chord given as dot numbers, e.g. '125' or [1, 2, 5]
+    mask = 0
+    for dot in dots:
+        dot = int(dot)
+        if not 1 <= dot <= 8:
+            raise ValueError('no dot %d in a braille cell' % dot)
+        mask |= 1 << (dot - 1)
+    return mask
+
+def maskToDots(mask):
+    return ''.join(str(dot + 1) for dot in range(8) if mask & (1 << dot))
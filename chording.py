@@ -0,0 +1,280 @@
+import argparse
+import cells
+import collections
+import louis
+import metrics
+import sys
+import time
+
+# chorded braille input: the keys of a chord are pressed together, the chord is complete once
+# they're all released, and the dots of the keys make one cell, like on a Perkins brailler
+# default keys, by keyboard module key name: f d s for dots 1 2 3, j k l for dots 4 5 6,
+# a and ; for dots 7 and 8
+dotKeys = {1: 'f', 2: 'd', 3: 's', 4: 'j', 5: 'k', 6: 'l', 7: 'a', 8: ';'}
+
+# chord commands besides cells
+SPACE = 'space'
+BACKSPACE = 'backspace'
+ENTER = 'enter'
+
+# key name -> dot mask or command
+chordKeyMap = {name: 1 << (dot - 1) for dot, name in dotKeys.items()}
+chordKeyMap.update({'space': SPACE, 'backspace': BACKSPACE, 'enter': ENTER})
+
+# text events handed to the application
+# PENDING: back-translation of the word being typed, replaces the previous PENDING text
+# COMMIT: final text of a finished word or separator, replaces the PENDING text
+# ERASE: committed text taken back by a backspace, the word is PENDING again
+PENDING = 'pending'
+COMMIT = 'commit'
+ERASE = 'erase'
+# latency is the time from the chord being complete to the event, in seconds
+TextEvent = collections.namedtuple('TextEvent', ['kind', 'text', 'latency'])
+
+# same shape as keyboard.KeyboardEvent, for the parts used here
+ChordKeyEvent = collections.namedtuple('ChordKeyEvent', ['event_type', 'name', 'time'])
+
+class ChordKeys:
+    # collects key events into chords and calls onChord(mask, command) for each one
+    # a chord is every key pressed from the first key down until all keys are up again
+    def __init__(self, onChord, keyMap=chordKeyMap):
+        self.onChord = onChord
+        self.keyMap = keyMap
+        self.held = set()
+        self.mask = 0
+        self.command = None
+
+    def onEvent(self, event):
+        # returns whether the key belongs to the chord keyboard
+        action = self.keyMap.get(event.name)
+        if action is None:
+            return False
+        if event.event_type == 'up':
+            self.held.discard(event.name)
+            if not self.held and (self.mask or self.command):
+                mask, command = self.mask, self.command
+                self.mask = 0
+                self.command = None
+                self.onChord(mask, command)
+            return True
+        # auto-repeat of a held key adds nothing
+        if event.name in self.held:
+            return True
+        self.held.add(event.name)
+        if isinstance(action, int):
+            self.mask |= action
+        else:
+            self.command = action
+        return True
+
+class ChordEngine:
+    # back-translates cells as the chords arrive
+    # the word being typed is back-translated again after every chord and sent as PENDING
+    # text, contractions only resolve once the word is finished by a space or enter, when it
+    # is back-translated one last time and sent as COMMIT
+    # a chord only costs the back-translation of the current word, and words longer than
+    # maxWordCells are committed early, so the latency per chord stays bounded
+    def __init__(self, translator, emit, maxWordCells=64, history=100):
+        self.translator = translator
+        self.emit = emit
+        self.maxWordCells = maxWordCells
+        self.word = bytearray()
+        # (masks, text) of recently committed words and separators, for backspace
+        self.committed = collections.deque(maxlen=history)
+        self.latency = metrics.Histogram()
+
+    def chord(self, mask, command=None):
+        start = time.perf_counter()
+        if command == SPACE:
+            self.commitWord()
+            self.commit(b'', ' ', start)
+        elif command == ENTER:
+            self.commitWord()
+            self.commit(b'', '\n', start)
+        elif command == BACKSPACE:
+            self.erase(start)
+        elif mask:
+            self.word.append(mask)
+            if len(self.word) >= self.maxWordCells:
+                self.commitWord(start)
+            else:
+                self.send(PENDING, self.backTranslate(self.word), start)
+        self.latency.observe(time.perf_counter() - start)
+
+    def backTranslate(self, masks):
+        return self.translator.backTranslateString(cells.fromMasks(masks))
+
+    def send(self, kind, text, start):
+        self.emit(TextEvent(kind, text, time.perf_counter() - start))
+
+    def commit(self, masks, text, start):
+        self.committed.append((bytes(masks), text))
+        self.send(COMMIT, text, start)
+
+    def commitWord(self, start=None):
+        if self.word:
+            self.commit(self.word, self.backTranslate(self.word), time.perf_counter() if start is None else start)
+            self.word = bytearray()
+
+    def erase(self, start):
+        if self.word:
+            del self.word[-1]
+            self.send(PENDING, self.backTranslate(self.word) if self.word else '', start)
+            return
+        if not self.committed:
+            return
+        masks, text = self.committed.pop()
+        self.send(ERASE, text, start)
+        if masks:
+            # backspace into a word takes it back, less its last cell
+            self.word = bytearray(masks[:-1])
+        elif self.committed and self.committed[-1][0]:
+            # backspace over a separator takes back the word before it, to be continued
+            masks, text = self.committed.pop()
+            self.send(ERASE, text, start)
+            self.word = bytearray(masks)
+        if self.word:
+            self.send(PENDING, self.backTranslate(self.word), start)
+
+    def flush(self):
+        # commits the word being typed, e.g. when input ends
+        self.commitWord()
+
+class TextBuffer:
+    # applies text events, what an application echoing the typed text would keep
+    def __init__(self):
+        self.committed = []
+        self.pending = ''
+
+    def __call__(self, event):
+        if event.kind == PENDING:
+            self.pending = event.text
+        elif event.kind == COMMIT:
+            self.committed.append(event.text)
+            self.pending = ''
+        elif event.kind == ERASE:
+            self.committed.pop()
+
+    @property
+    def text(self):
+        return ''.join(self.committed) + self.pending
+
+class KeyboardChords:
+    # live chord input from the keyboard module, chord keys are suppressed so they don't type
+    def __init__(self, engine, keyMap=chordKeyMap):
+        self.engine = engine
+        self.keys = ChordKeys(engine.chord, keyMap)
+        self.hook = None
+
+    def onEvent(self, event):
+        # False suppresses the key, other keys go through to the system
+        return not self.keys.onEvent(event)
+
+    def start(self):
+        import keyboard
+        self.hook = keyboard.hook(self.onEvent, suppress=True)
+
+    def stop(self):
+        import keyboard
+        if self.hook is not None:
+            keyboard.unhook(self.hook)
+            self.hook = None
+
+def chordsFor(translator, text):
+    # the chords that type text: its cells, with a space chord for blank cells and enter for newlines
+    chords = []
+    for i, line in enumerate(text.split('\n')):
+        if i:
+            chords.append(ENTER)
+        for mask in cells.toMasks(translator.translateString(line)) if line else b'':
+            chords.append(mask if mask else SPACE)
+    return chords
+
+def keyScript(chords, interval=0.2, hold=0.08, keyMap=chordKeyMap):
+    # key events for a list of chords (masks, dot strings like '125' or commands), one chord
+    # every interval seconds, keys pressed in dot order and released together after hold seconds
+    names = {action: name for name, action in keyMap.items()}
+    events = []
+    for i, chord in enumerate(chords):
+        if isinstance(chord, str) and chord.isdigit():
+            chord = cells.dotsToMask(chord)
+        if isinstance(chord, int):
+            keys = [names[1 << dot] for dot in range(8) if chord & (1 << dot)]
+        else:
+            keys = [names[chord]]
+        start = i * interval
+        for j, name in enumerate(keys):
+            events.append(ChordKeyEvent('down', name, start + j * 0.005))
+        for name in keys:
+            events.append(ChordKeyEvent('up', name, start + hold))
+    return events
+
+class Replay:
+    # feeds a key script to an engine, without a keyboard
+    # with realtime the script's timing is kept, otherwise events are fed as fast as possible
+    def __init__(self, engine, events, realtime=False):
+        self.engine = engine
+        self.events = events
+        self.realtime = realtime
+
+    def run(self):
+        keys = ChordKeys(self.engine.chord)
+        start = time.perf_counter()
+        for event in self.events:
+            if self.realtime:
+                delay = event.time - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            keys.onEvent(event)
+        self.engine.flush()
+        return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Chorded braille input.')
+    parser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    parser.add_argument('--mode', type=int, default=louis.ucBrl | louis.noUndefined, help='translation mode')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('type', help='type on the keyboard in chords, escape to stop')
+    replayParser = commands.add_parser('replay', help='replay chords for some text and check the text typed')
+    replayParser.add_argument('files', nargs='*', help='text, stdin by default')
+    replayParser.add_argument('--interval', type=float, default=0.2, help='seconds between chords')
+    replayParser.add_argument('--realtime', action='store_true', help='keep the timing of the chords')
+    replayParser.add_argument('--budget-ms', type=float, help='fail if the 99th percentile chord latency is over this')
+    args = parser.parse_args()
+    translator = louis.Translator(args.tables.encode().split(b','), mode=args.mode)
+    if args.command == 'type':
+        import keyboard
+        def echo(event):
+            if event.kind == COMMIT:
+                sys.stdout.write(event.text)
+                sys.stdout.flush()
+        chords = KeyboardChords(ChordEngine(translator, echo))
+        chords.start()
+        try:
+            keyboard.wait('esc')
+        finally:
+            chords.stop()
+        return
+    if args.files:
+        text = ''.join(open(name, encoding='utf-8').read() for name in args.files)
+    else:
+        text = sys.stdin.read()
+    text = text.rstrip('\n')
+    buffer = TextBuffer()
+    engine = ChordEngine(translator, buffer)
+    chords = chordsFor(translator, text)
+    elapsed = Replay(engine, keyScript(chords, args.interval), args.realtime).run()
+    latency = engine.latency
+    print('%d chords in %.3f s, latency per chord: p50 %.1f us, p95 %.1f us, p99 %.1f us, max %.1f us' % (
+        latency.count, elapsed, latency.quantile(0.5) * 1e6, latency.quantile(0.95) * 1e6, latency.quantile(0.99) * 1e6, latency.max * 1e6))
+    failed = False
+    if buffer.text != text:
+        print('typed text differs from the input:\n%r\n%r' % (text, buffer.text))
+        failed = True
+    if args.budget_ms is not None and latency.quantile(0.99) * 1000 > args.budget_ms:
+        print('p99 latency over the %.1f ms budget' % args.budget_ms)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import cells
+
+class Display:
+    # a refreshable braille display of `size` cells
+    # backends get one writeRanges call per frame with only the cells that changed
+    def __init__(self, size):
+        self.size = size
+
+    def writeRanges(self, ranges):
+        # ranges is a list of (start, masks): cells start to start + len(masks) get masks
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class TerminalDisplay(Display):
+    # prints the whole line of cells each time it changes
+    def __init__(self, size, output=print):
+        super().__init__(size)
+        self.frame = bytearray(size)
+        self.output = output
+
+    def writeRanges(self, ranges):
+        for start, masks in ranges:
+            self.frame[start:start + len(masks)] = masks
+        self.output(cells.fromMasks(self.frame))
+
+class MemoryDisplay(Display):
+    # keeps the cells in memory and records every write, for tests and simulation
+    def __init__(self, size):
+        super().__init__(size)
+        self.frame = bytearray(size)
+        self.writes = []
+        self.cellWrites = 0
+
+    def writeRanges(self, ranges):
+        self.writes.append([(start, bytes(masks)) for start, masks in ranges])
+        for start, masks in ranges:
+            self.frame[start:start + len(masks)] = masks
+            self.cellWrites = self.cellWrites + len(masks)
+
+    def cells(self):
+        return cells.fromMasks(self.frame)
+
+class DriverDisplay(Display):
+    # hook for hardware drivers: send(ranges) is called once per frame with the changed cells
+    def __init__(self, size, send, close=None):
+        super().__init__(size)
+        self.send = send
+        self.closeDriver = close
+
+    def writeRanges(self, ranges):
+        self.send(ranges)
+
+    def close(self):
+        if self.closeDriver is not None:
+            self.closeDriver()
+
+# display backends by name, drivers can add their own factory taking the display size
+backends = {'terminal': TerminalDisplay, 'memory': MemoryDisplay}
+
+def register(name, factory):
+    backends[name] = factory
+
+def create(name, size):
+    try:
+        factory = backends[name]
+    except KeyError:
+        raise ValueError('unknown display backend %r, expected one of %s' % (name, ', '.join(sorted(backends))))
+    return factory(size)
+
+def diff(old, new, mergeGap=0):
+    # changed cell ranges between two frames of the same size, as (start, end) pairs
+    # ranges separated by at most mergeGap unchanged cells are merged into one
+    ranges = []
+    start = None
+    for i in range(len(new)):
+        if old[i] != new[i]:
+            if start is None:
+                if ranges and i - ranges[-1][1] <= mergeGap:
+                    start = ranges.pop()[0]
+                else:
+                    start = i
+        elif start is not None:
+            ranges.append((start, i))
+            start = None
+    if start is not None:
+        ranges.append((start, len(new)))
+    return ranges
+
+class FrameWriter:
+    # writes frames to a display, sending only the cells that differ from what it shows
+    def __init__(self, display, mergeGap=0):
+        self.display = display
+        self.mergeGap = mergeGap
+        # the display starts out blank
+        self.current = bytearray(display.size)
+
+    def show(self, masks):
+        # masks can be any bytes-like page, shorter pages are padded with blank cells
+        frame = bytearray(self.display.size)
+        masks = bytes(masks[:self.display.size])
+        frame[:len(masks)] = masks
+        ranges = diff(self.current, frame, self.mergeGap)
+        if ranges:
+            self.display.writeRanges([(start, frame[start:end]) for start, end in ranges])
+            self.current = frame
+        return ranges
+
+    def showCells(self, text):
+        return self.show(cells.toMasks(text))
+
+    def refresh(self):
+        # rewrites every cell, e.g. after the display was reset
+        self.display.writeRanges([(0, bytes(self.current))])
@@ -0,0 +1,151 @@
+import argparse
+import brailledict
+import cells
+import louis
+import mappedfile
+import os
+import pagination
+import sys
+import time
+
+# precompiled documents: the cells, position maps and page index of a PageIndex in one file,
+# so a document opens without reading the text again or calling liblouis
+# layout: a mappedfile header, then (uint32, native byte order) page starts, page ends,
+# cell -> text offset, text offset -> cell with an entry for the end of the text, then one dot
+# mask byte per cell and the UTF-8 text
+magic = b'TTDOC1\0\0'
+formatVersion = 3
+
+def tableNames(tables):
+    # louis takes table names as bytes or str, the header has them as str
+    return [table.decode() if isinstance(table, bytes) else table for table in tables]
+
+def tableFiles(tables):
+    # the table files the tables load, with their modification time and size: a document is
+    # opened by checking these, without reading or hashing the tables
+    files = []
+    for path in brailledict.tableFiles(tables):
+        stat = os.stat(path)
+        files.append([path, stat.st_mtime_ns, stat.st_size])
+    return files
+
+def build(pages, path):
+    # writes a PageIndex to path, returns the size of the file
+    text = pages.text.encode('utf-8')
+    translator = pages.translator
+    header = {
+        'version': formatVersion,
+        'pages': len(pages),
+        'cells': pages.cellCount(),
+        'characters': len(pages.text),
+        'text_bytes': len(text),
+        # everything the cells and pages depend on, a document is only used if all of it matches
+        'tables': tableNames(translator.tableList),
+        # the syllable breaks come from the hyphenation tables, None if they didn't compile
+        'hyphen_tables': None if pages.hyphenTables is None else tableNames(pages.hyphenTables),
+        'table_files': tableFiles(list(translator.tableList) + list(pages.hyphenTables or [])),
+        'liblouis': louis.version(),
+        'mode': translator.mode,
+        'width': pages.width,
+        'contracted': bool(pages.contracted),
+    }
+    return mappedfile.write(path, magic, header, [pages.starts, pages.ends, pages.inPos, pages.outPos, pages.masks, text])
+
+class CompiledDocument(pagination.PageIndex):
+    # read-only, memory-mapped PageIndex: opening only reads the header, pages are read from the
+    # file as they are shown and the text is only decoded for searching
+    def __init__(self, path):
+        self.map, self.header, offset = mappedfile.read(path, magic, formatVersion, 'compiled document')
+        self.translator = None
+        self.width = self.header['width']
+        self.contracted = self.header['contracted']
+        self.mapView = memoryview(self.map)
+        sections = []
+        for count in (self.header['pages'], self.header['pages'], self.header['cells'], self.header['characters'] + 1):
+            sections.append(self.mapView[offset:offset + 4 * count].cast('I'))
+            offset += 4 * count
+        self.starts, self.ends, self.inPos, self.outPos = sections
+        self.masks = self.view = self.mapView[offset:offset + self.header['cells']]
+        offset += self.header['cells']
+        self.textView = self.mapView[offset:offset + self.header['text_bytes']]
+        self.decoded = None
+
+    @property
+    def text(self):
+        if self.decoded is None:
+            self.decoded = str(self.textView, 'utf-8')
+        return self.decoded
+
+    def matches(self, tables, mode, width, contracted, hyphenTables=None):
+        # the settings and the table files as they were at build time, liblouis isn't loaded
+        # hyphenTables defaults to the tables PageIndex would use
+        if hyphenTables is None:
+            hyphenTables = list(tables) + pagination.hyphenation
+        if (self.header['tables'] != tableNames(tables) or self.header['mode'] != mode
+                or self.header['width'] != width or self.header['contracted'] != bool(contracted)):
+            return False
+        if self.header['hyphen_tables'] not in (None, tableNames(hyphenTables)):
+            return False
+        for path, mtime, size in self.header['table_files']:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime or stat.st_size != size:
+                return False
+        return True
+
+    def libraryMatches(self):
+        # loads liblouis, so it is left to the check command and not done on every open
+        return self.header['liblouis'] == louis.version()
+
+    def close(self):
+        for view in (self.starts, self.ends, self.inPos, self.outPos, self.masks, self.textView, self.mapView):
+            view.release()
+        self.map.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile documents to memory-mapped braille pages.')
+    parser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    parser.add_argument('--mode', type=int, default=louis.ucBrl | louis.noUndefined, help='translation mode')
+    parser.add_argument('--width', type=int, default=10, help='cells on the display')
+    parser.add_argument('--contracted', action='store_true', help='grade 2 translation')
+    commands = parser.add_subparsers(dest='command', required=True)
+    buildParser = commands.add_parser('build', help='translate and paginate a text file')
+    buildParser.add_argument('document')
+    buildParser.add_argument('files', nargs='*', help='text, stdin by default')
+    checkParser = commands.add_parser('check', help='check that a document matches the current tables and settings')
+    checkParser.add_argument('document')
+    showParser = commands.add_parser('show', help='print pages of a document')
+    showParser.add_argument('document')
+    showParser.add_argument('--page', type=int, default=0, help='first page to print')
+    showParser.add_argument('--count', type=int, default=1, help='pages to print')
+    args = parser.parse_args()
+    tables = args.tables.encode().split(b',')
+    if args.command == 'build':
+        if args.files:
+            text = ''.join(open(name, encoding='utf-8').read() for name in args.files)
+        else:
+            text = sys.stdin.read()
+        start = time.perf_counter()
+        translator = louis.Translator(tables, mode=args.mode)
+        pages = pagination.PageIndex(translator, text, args.width, args.contracted)
+        size = build(pages, args.document)
+        print('%d characters, %d cells, %d pages to %s (%d bytes) in %.2f s' % (
+            len(text), pages.cellCount(), len(pages), args.document, size, time.perf_counter() - start))
+        return
+    start = time.perf_counter()
+    document = CompiledDocument(args.document)
+    if args.command == 'check':
+        if not (document.matches(tables, args.mode, args.width, args.contracted) and document.libraryMatches()):
+            print('%s is out of date for these tables and settings, rebuild it' % args.document)
+            sys.exit(1)
+        print('%s: %d pages, %d cells, up to date' % (args.document, len(document), document.cellCount()))
+    elif args.command == 'show':
+        for n in range(args.page, min(len(document), args.page + args.count)):
+            print(cells.fromMasks(document[n]))
+        print('opened and shown in %.3f ms' % ((time.perf_counter() - start) * 1000), file=sys.stderr)
+    document.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import bisect
+
+def previousWord(text, position):
+    # start of the word before position
+    while position > 0 and text[position - 1].isspace():
+        position -= 1
+    while position > 0 and not text[position - 1].isspace():
+        position -= 1
+    return position
+
+def nextWord(text, position):
+    # start of the word after position, or the end of the text
+    while position < len(text) and not text[position].isspace():
+        position += 1
+    while position < len(text) and text[position].isspace():
+        position += 1
+    return position
+
+class IncrementalTranslator:
+    # keeps a line of text and its cells in sync while the line is edited
+    # the line is translated whole once; an edit re-translates the words it touches with words
+    # of context on each side and splices the cells in, the position maps of the translation
+    # giving the cells of those words
+    # rules can span words (capitalised passages, emphasis), so the span is widened a word at a
+    # time until the context words translate to the same cells as before, the cells outside it
+    # are then unchanged; a context word can itself depend on the words past it, e.g. the three
+    # words that start a passage, so two are compared on each side
+    context = 2
+
+    def __init__(self, translator, text=''):
+        self.translator = translator
+        self.setText(text)
+
+    def setText(self, text):
+        self.text = text
+        self.cells, self.inPos, self.outPos = self.translate(text)
+
+    def retranslate(self):
+        # full re-translation of the line, returns the changed cell range like edit()
+        old = self.cells
+        self.setText(self.text)
+        return 0, len(old), len(self.cells)
+
+    def translate(self, text):
+        if not text:
+            return '', [], []
+        cells, inPos, outPos, _ = self.translator.translate(text)
+        return cells, list(inPos), list(outPos)
+
+    def firstCell(self, inPos, position):
+        # the first cell of the character at position, cells before it show earlier characters
+        return bisect.bisect_left(inPos, position)
+
+    def edit(self, start, end, replacement=''):
+        # replaces text[start:end] and returns (cellStart, oldCellEnd, newCellEnd):
+        # cells[cellStart:oldCellEnd] of the old line became cells[cellStart:newCellEnd]
+        text = self.text
+        newText = text[:start] + replacement + text[end:]
+        shift = len(replacement) - (end - start)
+        # the words the edit touches, words next to it too, since it may join them
+        spanStart = start
+        while spanStart > 0 and not text[spanStart - 1].isspace():
+            spanStart -= 1
+        spanEnd = nextWord(text, end)
+        # old text positions, the window in the new text ends at windowEnd + shift
+        windowStart = spanStart
+        windowEnd = spanEnd
+        for _ in range(self.context):
+            windowStart = previousWord(text, windowStart)
+            windowEnd = nextWord(text, windowEnd)
+        while True:
+            cells, inPos, outPos = self.translate(newText[windowStart:windowEnd + shift])
+            oldStart = self.firstCell(self.inPos, windowStart)
+            oldEnd = self.firstCell(self.inPos, windowEnd)
+            leftSame = windowStart == spanStart or (
+                cells[:self.firstCell(inPos, spanStart - windowStart)] == self.cells[oldStart:self.firstCell(self.inPos, spanStart)])
+            rightSame = windowEnd == spanEnd or (
+                cells[self.firstCell(inPos, spanEnd + shift - windowStart):] == self.cells[self.firstCell(self.inPos, spanEnd):oldEnd])
+            if (leftSame or windowStart == 0) and (rightSame or windowEnd == len(text)):
+                break
+            if not leftSame:
+                windowStart = previousWord(text, windowStart)
+            if not rightSame:
+                windowEnd = nextWord(text, windowEnd)
+        old = self.cells[oldStart:oldEnd]
+        cellShift = len(cells) - len(old)
+        self.text = newText
+        self.cells = self.cells[:oldStart] + cells + self.cells[oldEnd:]
+        self.inPos[oldStart:] = [windowStart + i for i in inPos] + [i + shift for i in self.inPos[oldEnd:]]
+        self.outPos[windowStart:] = [oldStart + i for i in outPos] + [i + cellShift for i in self.outPos[windowEnd:]]
+        # only the cells that differ are reported, the context words usually stay the same
+        limit = min(len(old), len(cells))
+        same = 0
+        while same < limit and old[same] == cells[same]:
+            same += 1
+        sameEnd = 0
+        while sameEnd < limit - same and old[-1 - sameEnd] == cells[-1 - sameEnd]:
+            sameEnd += 1
+        return oldStart + same, oldEnd - sameEnd, oldStart + len(cells) - sameEnd
+
+    def insert(self, position, text):
+        return self.edit(position, position, text)
+
+    def delete(self, start, end):
+        return self.edit(start, end)
+
+    def cellPosition(self, position):
+        # the cell showing the character at text position, e.g. for the cursor
+        if position < len(self.outPos):
+            return self.outPos[position]
+        return len(self.cells)
+
+    def textPosition(self, cell):
+        # the text position shown by a cell, e.g. for routing keys
+        if cell < len(self.inPos):
+            return self.inPos[cell]
+        return len(self.text)
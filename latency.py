@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import json
+import navigation
+import os
+import sys
+import time
+import touchtype
+
+# replays keystroke and navigation traces through the touchtype pipeline, with a fake keyboard
+# and a simulated display, and reports the time from each key event to the updated cells
+# a trace is JSON lines, one event each, t in seconds from the start of the trace:
+# {"t": 0.5, "key": "n"} a navigation key, by keyboard module key name, see navigation.keyMap
+# {"t": 0.5, "text": "a"} typed text, appended to the document, which is paginated again and
+# its last page shown, as if the text were typed in at the end
+# every run of keys starts by opening the document: it is paginated again and page 0 shown
+# event kinds as reported: type, open and the navigation commands
+TYPE = 'type'
+OPEN = 'open'
+
+def percentile(samples, q):
+    # nearest rank percentile of sorted samples
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+class ReplayEvents(navigation.KeyEvents):
+    # fake keyboard for one run of navigation keys: get() ends the event being handled, which
+    # the navigator only asks for once the page is shown, and feeds the next key of the trace
+    def __init__(self, replay, events):
+        super().__init__()
+        self.replay = replay
+        self.events = iter(events)
+
+    def get(self):
+        self.replay.finish()
+        for event in self.events:
+            self.replay.begin(event, None)
+            self.onEvent(navigation.KeyEvent('down', event['key']))
+            self.onEvent(navigation.KeyEvent('up', event['key']))
+            if not self.commands.empty():
+                command = self.commands.get()
+                self.replay.kind = command
+                return command
+            # keys without a command cost nothing to the user, they aren't counted
+            self.replay.pending = None
+        return navigation.QUIT
+
+    def stop(self):
+        self.replay.finish()
+
+class Replay:
+    # feeds a trace to touchtype, document is the text there before the first typed event
+    # with realtime the trace's timing is kept and latency counts from when an event was due,
+    # so time spent behind schedule shows up; otherwise events are fed as fast as possible
+    def __init__(self, events, document='', realtime=False):
+        self.events = events
+        self.text = document
+        self.realtime = realtime
+        self.samples = {}
+        self.cpu = {}
+        self.pending = None
+        self.kind = None
+
+    def begin(self, event, kind):
+        due = self.started + event.get('t', 0.0)
+        now = time.perf_counter()
+        if self.realtime and due > now:
+            time.sleep(due - now)
+            now = time.perf_counter()
+        start = min(due, now) if self.realtime else now
+        self.kind = kind
+        self.pending = (start, time.process_time())
+
+    def finish(self):
+        if self.pending is None:
+            return
+        start, cpu = self.pending
+        self.pending = None
+        self.samples.setdefault(self.kind, []).append(time.perf_counter() - start)
+        self.cpu[self.kind] = self.cpu.get(self.kind, 0.0) + time.process_time() - cpu
+
+    def type(self, event):
+        self.begin(event, TYPE)
+        self.text = self.text + event['text']
+        pages = touchtype.paginate(self.text)
+        if len(pages):
+            touchtype.printChunk(pages[-1])
+        self.finish()
+
+    def navigate(self, events):
+        # the real navigator over the document's pages, with the fake keyboard in place of the keyboard module
+        replayEvents = ReplayEvents(self, events)
+        keyEvents = touchtype.keyEvents
+        touchtype.keyEvents = lambda: replayEvents
+        try:
+            self.begin(events[0], OPEN)
+            touchtype.printChunks(touchtype.paginate(self.text))
+        finally:
+            touchtype.keyEvents = keyEvents
+
+    def run(self):
+        # returns the wall clock and CPU seconds of the whole replay
+        self.started = time.perf_counter()
+        cpu = time.process_time()
+        keys = []
+        for event in self.events:
+            if 'key' in event:
+                keys.append(event)
+                continue
+            if keys:
+                self.navigate(keys)
+                keys = []
+            self.type(event)
+        if keys:
+            self.navigate(keys)
+        return time.perf_counter() - self.started, time.process_time() - cpu
+
+    def report(self, elapsed, cpu):
+        kinds = {}
+        everything = []
+        for kind, samples in sorted(self.samples.items()):
+            samples.sort()
+            kinds[kind] = self.summary(samples, self.cpu[kind])
+            if kind != OPEN:
+                everything.extend(samples)
+        everything.sort()
+        keystrokes = self.summary(everything, sum(value for kind, value in self.cpu.items() if kind != OPEN))
+        events = sum(len(samples) for samples in self.samples.values())
+        return {
+            'events': events,
+            'elapsed_s': elapsed,
+            'cpu_s': cpu,
+            'events_per_s': events / elapsed if elapsed else 0.0,
+            'keystrokes': keystrokes,
+            'kinds': kinds,
+            'cell_writes': getattr(touchtype.frames.display, 'cellWrites', None),
+        }
+
+    def summary(self, samples, cpu):
+        return {
+            'count': len(samples),
+            'p50_s': percentile(samples, 0.5),
+            'p95_s': percentile(samples, 0.95),
+            'p99_s': percentile(samples, 0.99),
+            'max_s': samples[-1] if samples else 0.0,
+            'cpu_per_event_s': cpu / len(samples) if samples else 0.0,
+        }
+
+def syntheticTrace(text, typed=200, interval=0.15, pageInterval=0.5, pages=None):
+    # types the last `typed` characters of text onto the rest, then reads through it: next to
+    # the end, back a few pages, last, first
+    # returns the document before typing and the trace
+    typed = min(typed, len(text))
+    document = text[:len(text) - typed]
+    events = []
+    t = 0.0
+    for character in text[len(document):]:
+        events.append({'t': t, 'text': character})
+        t = t + interval
+    if pages is None:
+        pages = len(touchtype.paginate(text))
+    keys = ['n'] * max(0, pages - 1) + ['p'] * min(5, max(0, pages - 1)) + ['end', 'home']
+    for key in keys:
+        events.append({'t': t, 'key': key})
+        t = t + pageInterval
+    return document, events
+
+def readTrace(lines):
+    return [json.loads(line) for line in lines if line.strip()]
+
+def record(path):
+    # records navigation keys and typed characters from the keyboard until escape
+    # keys bound to navigation commands are recorded as keys, other printable keys as typed text
+    import keyboard
+    events = []
+    start = time.perf_counter()
+    def onEvent(event):
+        if event.event_type != 'down':
+            return
+        t = time.perf_counter() - start
+        if event.name in navigation.keyMap:
+            events.append({'t': t, 'key': event.name})
+        elif event.name in ('space', 'enter'):
+            events.append({'t': t, 'text': ' ' if event.name == 'space' else '\n'})
+        elif len(event.name) == 1:
+            events.append({'t': t, 'text': event.name})
+    hook = keyboard.hook(onEvent)
+    try:
+        keyboard.wait('esc')
+    finally:
+        keyboard.unhook(hook)
+    with open(path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+    return len(events)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay key traces through touchtype and measure the latency to the display.')
+    parser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    parser.add_argument('--size', type=int, default=touchtype.dispSize, help='cells on the display')
+    parser.add_argument('--contracted', action='store_true', help='grade 2 translation')
+    commands = parser.add_subparsers(dest='command', required=True)
+    recordParser = commands.add_parser('record', help='record a trace from the keyboard, escape to stop')
+    recordParser.add_argument('trace')
+    replayParser = commands.add_parser('replay', help='replay a trace, or a synthetic one for some text')
+    replayParser.add_argument('files', nargs='*', help='document text, stdin by default')
+    replayParser.add_argument('--trace', help='JSON lines trace, synthetic if not given')
+    replayParser.add_argument('--typed', type=int, default=200, help='characters typed in a synthetic trace')
+    replayParser.add_argument('--realtime', action='store_true', help='keep the timing of the trace')
+    replayParser.add_argument('--p50-ms', type=float, help='fail if the median keystroke latency is over this')
+    replayParser.add_argument('--p95-ms', type=float, help='fail if the 95th percentile keystroke latency is over this')
+    replayParser.add_argument('--p99-ms', type=float, help='fail if the 99th percentile keystroke latency is over this')
+    replayParser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+    if args.command == 'record':
+        print('%d events recorded to %s' % (record(args.trace), args.trace))
+        return
+    if args.files:
+        text = ''.join(open(name, encoding='utf-8').read() for name in args.files)
+    elif args.trace:
+        text = ''
+    else:
+        text = sys.stdin.read()
+    touchtype.tables = args.tables.encode().split(b',')
+    touchtype.dispSize = args.size
+    touchtype.contracted = args.contracted
+    touchtype.displayName = 'memory'
+    # touchtype prints as it goes, the report shouldn't be lost in it
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        touchtype.init()
+        if args.trace:
+            with open(args.trace, encoding='utf-8') as f:
+                events = readTrace(f)
+            document = text
+        else:
+            document, events = syntheticTrace(text, args.typed)
+        replay = Replay(events, document, args.realtime)
+        elapsed, cpu = replay.run()
+    report = replay.report(elapsed, cpu)
+    failed = []
+    keystrokes = report['keystrokes']
+    for name, budget in (('p50', args.p50_ms), ('p95', args.p95_ms), ('p99', args.p99_ms)):
+        if budget is not None and keystrokes[name + '_s'] * 1000 > budget:
+            failed.append('%s keystroke latency %.2f ms over the %.2f ms budget' % (name, keystrokes[name + '_s'] * 1000, budget))
+    if args.json:
+        report['failed'] = failed
+        print(json.dumps(report, indent=2))
+    else:
+        print('%d events in %.3f s, %.0f events/s, %.1f ms CPU' % (report['events'], elapsed, report['events_per_s'], cpu * 1000))
+        for kind, summary in [('all keys', keystrokes)] + sorted(report['kinds'].items()):
+            print('%-9s %5d  p50 %8.3f ms  p95 %8.3f ms  p99 %8.3f ms  max %8.3f ms  CPU %8.1f us/event' % (
+                kind, summary['count'], summary['p50_s'] * 1000, summary['p95_s'] * 1000, summary['p99_s'] * 1000,
+                summary['max_s'] * 1000, summary['cpu_per_event_s'] * 1e6))
+        for message in failed:
+            print(message)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
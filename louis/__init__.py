@@ -38,8 +38,11 @@ function for information about how liblouis searches for these tables.
 """
 
 from __future__ import unicode_literals
-from sys import getfilesystemencoding, platform, version_info
+from array import array
+from sys import getfilesystemencoding, getsizeof, platform, version_info
 from atexit import register
+from collections import OrderedDict
+from threading import Lock, local
 from ctypes import (
     c_ushort,
     CFUNCTYPE,
@@ -50,6 +53,10 @@ from ctypes import (
     POINTER,
     byref,
     create_string_buffer,
+    sizeof,
+    addressof,
+    memmove,
+    memset,
 )
 
 try:  # Native win32
@@ -58,31 +65,90 @@ try:  # Native win32
     _loader, _functype = windll, WINFUNCTYPE
 except ImportError:  # Unix/Cygwin
     _loader, _functype = cdll, CFUNCTYPE
-liblouis = _loader["liblouis.so.20"]
 _is_py3 = version_info[0] == 3
 _is_windows = platform == "win32"
 _unicode_type = str if _is_py3 else unicode
+_unichr = chr if _is_py3 else unichr
+
+
+class _Library(object):
+    """liblouis, loaded on first use.
+    Importing this module doesn't load the library: the first attribute
+    looked up here loads it with L{_loadLibrary}. Functions are cached on
+    this object once they have been looked up.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        function = getattr(_loadLibrary(), name)
+        setattr(self, name, function)
+        return function
+
+
+liblouis = _Library("liblouis.so.20")
+#: The loaded library, C{None} until L{_loadLibrary} has run.
+_lib = None
+_loadLock = Lock()
 
 # { Module Configuration
-#: Specifies the charSize (in bytes) used by liblouis.
-#: This is fetched once using L{liblouis.lou_charSize}.
-#: Call it directly, since L{charSize} is not yet defined.
-#: @type: int
-wideCharBytes = liblouis.lou_charSize()
-#: Specifies the number by which the input length should be multiplied
-#: to calculate the maximum output length.
-#: @type: int
+# These depend on liblouis and are set by _loadLibrary when it is loaded,
+# looking one of them up before then loads it:
+# wideCharBytes, the charSize (in bytes) used by liblouis, fetched once using lou_charSize.
+# outlenMultiplier, the number by which the input length should be multiplied
+# to calculate the maximum output length, 4 + wideCharBytes * 2 unless it was set before.
 # This default will handle the case where every input character is
 # undefined in the translation table.
-outlenMultiplier = 4 + wideCharBytes * 2
+# conversionEncoding, the encoding to use when converting from byte strings to unicode strings.
+#: Specifies the number by which the input length is multiplied
+#: to size the output buffer for the first translation attempt.
+#: If liblouis runs out of room, the buffer is doubled and the translation retried,
+#: up to the worst case given by L{outlenMultiplier}.
+#: @type: int
+outlenEstimate = 2
+#: Specifies the number of output characters added to the first estimate,
+#: so that short strings with indicators don't need a retry.
+#: @type: int
+outlenSlack = 16
 #: Specifies the encoding to use when encode/decode file/dir name
 #: @type: str
 fileSystemEncoding = "mbcs" if _is_windows else getfilesystemencoding()
-#: Specifies the encoding to use when converting from byte strings to unicode strings.
-#: @type: str
-conversionEncoding = "utf_%d_le" % (wideCharBytes * 8)
 # }
 
+#: Module attributes that only exist once liblouis is loaded, see L{__getattr__}.
+_libraryAttributes = ("wideCharBytes", "outlenMultiplier", "conversionEncoding")
+
+
+def _loadLibrary():
+    """Load liblouis, declare its function types, register L{liblouis.lou_free}
+    to run at exit and fetch the char size, once.
+    @return: The loaded library.
+    """
+    global _lib, wideCharBytes, outlenMultiplier, conversionEncoding
+    if _lib is not None:
+        return _lib
+    with _loadLock:
+        if _lib is None:
+            lib = _loader[liblouis._name]
+            _declareFunctions(lib)
+            register(lib.lou_free)
+            wideCharBytes = lib.lou_charSize()
+            if "outlenMultiplier" not in globals():
+                outlenMultiplier = 4 + wideCharBytes * 2
+            conversionEncoding = "utf_%d_le" % (wideCharBytes * 8)
+            _lib = lib
+    return _lib
+
+
+def __getattr__(name):
+    """Load liblouis when one of the attributes that depend on it is looked up."""
+    if name in _libraryAttributes:
+        _loadLibrary()
+        return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
 # Some general utility functions
 def _createTablesString(tablesList):
     """Creates a tables string for liblouis calls"""
@@ -96,110 +162,511 @@ def _createTablesString(tablesList):
 
 def _createTypeformbuf(length, typeform=None):
     """Creates a typeform buffer for liblouis calls"""
-    return (c_ushort * length)(*typeform) if typeform else (c_ushort * length)()
+    buf = (c_ushort * length)()
+    if typeform:
+        # Converted by array in one C loop rather than unpacked into the ctypes constructor.
+        data = array("H", typeform[:length])
+        memmove(buf, data.buffer_info()[0], len(data) * sizeof(c_ushort))
+    return buf
+
+
+def _typeformList(typeformbuf):
+    """Creates a list of the typeforms in a typeform buffer"""
+    return array("H", bytearray(typeformbuf)).tolist()
+
+
+def _typeformView(typeform):
+    """Get a writable byte view of a typeform buffer, or C{None} for lists and tuples.
+    @raise TypeError: If the buffer is read-only or not contiguous.
+    @raise ValueError: If its length isn't a whole number of 16 bit typeforms.
+    """
+    if typeform is None or isinstance(typeform, (list, tuple)) or not _is_py3:
+        return None
+    view = memoryview(typeform)
+    if view.readonly or not view.c_contiguous:
+        raise TypeError("typeform buffers must be writable and contiguous")
+    view = view.cast("B")
+    if len(view) % sizeof(c_ushort):
+        raise ValueError(
+            "typeform buffer of %d bytes is not a whole number of 16 bit typeforms"
+            % len(view)
+        )
+    return view
+
+
+class _BufferPool(local):
+    """Per-thread buffers for liblouis calls, reused from call to call.
+    A buffer is replaced by a larger one when a call needs more room.
+    Buffers larger than L{maxPooledBytes} are not kept, so one huge document
+    doesn't pin its buffers for the rest of the session.
+    """
+
+    maxPooledBytes = 1 << 20
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, ctype, length):
+        """Get a buffer of at least C{length} items of C{ctype}.
+        The contents are left over from earlier calls.
+        """
+        buf = self.buffers.get(name)
+        if buf is None or len(buf) < length:
+            size = 64
+            while size < length:
+                size *= 2
+            buf = (ctype * size)()
+            if sizeof(buf) <= self.maxPooledBytes:
+                self.buffers[name] = buf
+        return buf
+
+
+_bufferPool = _BufferPool()
 
 
 ENCODING_ERROR_HANDLER = "surrogatepass" if _is_py3 else "strict"
 
 
-def createEncodedByteString(
-    x, encoding=conversionEncoding, errors=ENCODING_ERROR_HANDLER
-):
+def createEncodedByteString(x, encoding=None, errors=ENCODING_ERROR_HANDLER):
+    if encoding is None:
+        if _lib is None:
+            _loadLibrary()
+        encoding = conversionEncoding
     return _unicode_type(x).encode(encoding, errors)
 
 
-register(liblouis.lou_free)
+def _isEncoded(x):
+    """Whether x is already encoded in L{conversionEncoding}."""
+    return isinstance(x, (bytearray, memoryview)) or (_is_py3 and isinstance(x, bytes))
 
-liblouis.lou_version.restype = c_char_p
 
-liblouis.lou_charSize.restype = c_int
+def _encodeInput(x):
+    """Get an input buffer for liblouis calls.
+    Strings are encoded with L{createEncodedByteString}.
+    C{bytes}, C{bytearray} and C{memoryview} objects are taken to be encoded
+    in L{conversionEncoding} already and are passed on without copying where possible.
+    """
+    if not _isEncoded(x):
+        return createEncodedByteString(x)
+    if _lib is None:
+        _loadLibrary()
+    if len(memoryview(x).cast("B")) % wideCharBytes:
+        raise ValueError(
+            "Encoded input must be a whole number of %d byte characters" % wideCharBytes
+        )
+    if isinstance(x, bytes):
+        return x
+    view = memoryview(x).cast("B")
+    if view.readonly:
+        return view.tobytes()
+    return (c_char * len(view)).from_buffer(view)
+
+
+class TranslationCache(object):
+    """A bounded, least recently used cache of translation results.
+    Entries are evicted once there are more than C{maxEntries} of them,
+    or once their estimated size goes over C{maxBytes}.
+    Use L{enableCache} to put one in front of the translation functions.
+    """
 
-liblouis.lou_translateString.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_ushort),
-    POINTER(c_char),
-    c_int,
-)
+    _missing = object()
+
+    def __init__(self, maxEntries=4096, maxBytes=None):
+        """
+        @param maxEntries: The maximum number of cached results, C{None} for no limit.
+        @type maxEntries: int
+        @param maxBytes: The maximum estimated size of the cached keys and results,
+            C{None} for no limit.
+        @type maxBytes: int
+        """
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _sizeOf(value):
+        if isinstance(value, (tuple, list)):
+            return getsizeof(value) + sum(
+                TranslationCache._sizeOf(item) for item in value
+            )
+        return getsizeof(value)
+
+    @staticmethod
+    def _copy(value):
+        # Position lists are handed out as copies, so callers can't change cached results.
+        if isinstance(value, tuple):
+            return tuple(
+                list(item) if isinstance(item, list) else item for item in value
+            )
+        return value
+
+    def get(self, key):
+        """Look up a result, marking it as most recently used.
+        @return: The cached result, or L{TranslationCache._missing}.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return self._missing
+            self._entries[key] = entry
+            self.hits += 1
+        return self._copy(entry[0])
+
+    def put(self, key, value):
+        """Store a result, evicting the least recently used ones as needed."""
+        size = self._sizeOf(key) + self._sizeOf(value)
+        if self.maxBytes is not None and size > self.maxBytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while (
+                self.maxEntries is not None and len(self._entries) > self.maxEntries
+            ) or (self.maxBytes is not None and self.bytes > self.maxBytes):
+                _, (_, evictedSize) = self._entries.popitem(last=False)
+                self.bytes -= evictedSize
+                self.evictions += 1
+
+    def call(self, key, typeform, func, *args):
+        """Return the cached result for key, or compute it with C{func(*args)}.
+        A typeform list is part of the key and is updated in place, as the
+        translation functions would.
+        Typeform buffers are updated in place by liblouis itself, so calls with one
+        bypass the cache.
+        """
+        if typeform is not None and not isinstance(typeform, (list, tuple)):
+            return func(*args)
+        if typeform is not None:
+            key = key + (tuple(typeform),)
+        result = self.get(key)
+        if result is self._missing:
+            result = func(*args)
+            self.put(
+                key,
+                (
+                    self._copy(result),
+                    list(typeform) if isinstance(typeform, list) else None,
+                ),
+            )
+            return result
+        result, typeformOut = result
+        if typeformOut is not None:
+            typeform[:] = typeformOut
+        return self._copy(result)
+
+    def clear(self):
+        """Drop every cached result. The statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """@return: The entry count, estimated size in bytes and hit, miss and eviction counters.
+        @rtype: dict
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+#: The cache in front of the translation functions, if any.
+#: Set through L{enableCache} and L{disableCache}.
+#: @type: L{TranslationCache}
+_cache = None
+
+
+def enableCache(maxEntries=4096, maxBytes=None):
+    """Cache the results of the translation functions.
+    Results are keyed by tables, function, mode, typeform and input.
+    @param maxEntries: The maximum number of cached results, C{None} for no limit.
+    @type maxEntries: int
+    @param maxBytes: The maximum estimated size of the cache, C{None} for no limit.
+    @type maxBytes: int
+    @return: The new cache, for reading its statistics.
+    @rtype: L{TranslationCache}
+    """
+    global _cache
+    _cache = TranslationCache(maxEntries, maxBytes)
+    return _cache
 
-liblouis.lou_translate.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_ushort),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_int),
-    POINTER(c_int),
-    c_int,
-)
 
-liblouis.lou_backTranslateString.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_ushort),
-    POINTER(c_char),
-    c_int,
-)
+def disableCache():
+    """Stop caching translation results and drop the cache."""
+    global _cache
+    _cache = None
 
-liblouis.lou_backTranslate.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_ushort),
-    POINTER(c_char),
-    POINTER(c_int),
-    POINTER(c_int),
-    POINTER(c_int),
-    c_int,
-)
 
-liblouis.lou_hyphenate.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    c_int,
-    POINTER(c_char),
-    c_int,
-)
+def getCache():
+    """@return: The cache in front of the translation functions, or C{None}.
+    @rtype: L{TranslationCache}
+    """
+    return _cache
 
-liblouis.lou_checkTable.argtypes = (c_char_p,)
 
-liblouis.lou_compileString.argtypes = (c_char_p, c_char_p)
+def _cacheable(inbuf):
+    return isinstance(inbuf, (_unicode_type, bytes))
 
-liblouis.lou_getTypeformForEmphClass.argtypes = (c_char_p, c_char_p)
 
-liblouis.lou_dotsToChar.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_char),
-    c_int,
-    c_int,
-)
+#: Lock around every liblouis call.
+#: liblouis is not reentrant: besides the compiled tables, the log callback and
+#: the log level, its translation functions work in process wide scratch buffers,
+#: so only one call may run at a time, whichever thread it comes from.
+#: The lock is not reentrant: a log callback must not call into liblouis.
+_louisLock = Lock()
+#: Tables strings liblouis has compiled, so later calls don't check them again.
+_compiledTables = set()
+
+
+def _useTables(tablesString):
+    """Take the liblouis lock and make sure the tables are compiled.
+    The caller releases the lock with C{_louisLock.release()}.
+    """
+    _louisLock.acquire()
+    if tablesString not in _compiledTables:
+        try:
+            if liblouis.lou_checkTable(tablesString):
+                _compiledTables.add(tablesString)
+        except BaseException:
+            _louisLock.release()
+            raise
+
+
+def _declareFunctions(lib):
+    """Declare the argument and result types of the liblouis functions used here."""
+    lib.lou_version.restype = c_char_p
+
+    lib.lou_charSize.restype = c_int
+
+    lib.lou_translateString.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_ushort),
+        POINTER(c_char),
+        c_int,
+    )
+
+    lib.lou_translate.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_ushort),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_int),
+        POINTER(c_int),
+        c_int,
+    )
+
+    lib.lou_backTranslateString.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_ushort),
+        POINTER(c_char),
+        c_int,
+    )
+
+    lib.lou_backTranslate.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_ushort),
+        POINTER(c_char),
+        POINTER(c_int),
+        POINTER(c_int),
+        POINTER(c_int),
+        c_int,
+    )
+
+    lib.lou_hyphenate.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        c_int,
+        POINTER(c_char),
+        c_int,
+    )
+
+    lib.lou_checkTable.argtypes = (c_char_p,)
+
+    lib.lou_compileString.argtypes = (c_char_p, c_char_p)
+
+    lib.lou_getTypeformForEmphClass.argtypes = (c_char_p, c_char_p)
+
+    lib.lou_dotsToChar.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_char),
+        c_int,
+        c_int,
+    )
+
+    lib.lou_charToDots.argtypes = (
+        c_char_p,
+        POINTER(c_char),
+        POINTER(c_char),
+        c_int,
+        c_int,
+    )
+
+    lib.lou_registerLogCallback.restype = None
+
+    lib.lou_setLogLevel.restype = None
+    lib.lou_setLogLevel.argtypes = (c_int,)
 
-liblouis.lou_charToDots.argtypes = (
-    c_char_p,
-    POINTER(c_char),
-    POINTER(c_char),
-    c_int,
-    c_int,
-)
 
 LogCallback = _functype(None, c_int, c_char_p)
 
-liblouis.lou_registerLogCallback.restype = None
 
-liblouis.lou_setLogLevel.restype = None
-liblouis.lou_setLogLevel.argtypes = (c_int,)
+def _louTranslate(
+    function, backward, positions, tablesString, inbuf, typeform, cursorPos, mode
+):
+    """Run a liblouis (back) translation function with right-sized, pooled buffers.
+    The output buffer starts at L{outlenEstimate} characters per input character.
+    liblouis stops early when it runs out of room, so whenever it didn't consume
+    all of the input, the buffer is doubled and the call retried,
+    up to the worst case given by L{outlenMultiplier}.
+    A typeform buffer (see L{_typeformView}) that holds at least as many typeforms
+    as the output buffer characters is handed to liblouis as it is; a shorter one
+    is copied in and out of a pooled buffer. Either way it is updated in place.
+    @return: A tuple of: the output buffer, the output length, the input length,
+        the input and output position buffers, the cursor position and the typeform buffer,
+        or C{None} if liblouis reported an error.
+    """
+    inlenValue = len(inbuf) // wideCharBytes
+    maxOutlen = inlenValue * outlenMultiplier
+    outlenValue = min(maxOutlen, inlenValue * outlenEstimate + outlenSlack)
+    inlen = c_int()
+    outlen = c_int()
+    cursor = c_int()
+    inPos = outPos = None
+    typeformView = _typeformView(typeform)
+    if typeformView is not None:
+        typeformBytes = len(typeformView)
+        # liblouis writes the output typeforms over the input ones, so these are kept for a retry
+        typeformIn = (
+            None
+            if backward
+            else typeformView[: inlenValue * sizeof(c_ushort)].tobytes()
+        )
+    _useTables(tablesString)
+    try:
+        retry = False
+        while True:
+            inlen.value = inlenValue
+            outlen.value = outlenValue
+            outbuf = _bufferPool.get("out", c_char, outlenValue * wideCharBytes)
+            typeformbuf = None
+            typeformCopied = False
+            if typeformView is not None:
+                if typeformBytes >= outlenValue * sizeof(c_ushort):
+                    # Room for the output typeforms, so liblouis works on the caller's buffer.
+                    typeformbuf = (
+                        c_ushort * (typeformBytes // sizeof(c_ushort))
+                    ).from_buffer(typeformView)
+                    if retry and typeformIn:
+                        typeformView[: len(typeformIn)] = typeformIn
+                else:
+                    typeformbuf = _bufferPool.get("typeform", c_ushort, outlenValue)
+                    typeformCopied = True
+                    filled = 0
+                    if typeformIn:
+                        memmove(typeformbuf, typeformIn, len(typeformIn))
+                        filled = len(typeformIn)
+                    memset(
+                        addressof(typeformbuf) + filled,
+                        0,
+                        outlenValue * sizeof(c_ushort) - filled,
+                    )
+            elif backward:
+                if isinstance(typeform, list):
+                    typeformbuf = _createTypeformbuf(outlenValue)
+            elif typeform:
+                typeformbuf = _createTypeformbuf(outlenValue, typeform)
+            if positions:
+                inPos = _bufferPool.get("inPos", c_int, outlenValue)
+                outPos = _bufferPool.get("outPos", c_int, inlenValue)
+                cursor.value = cursorPos
+                ok = function(
+                    tablesString,
+                    inbuf,
+                    byref(inlen),
+                    outbuf,
+                    byref(outlen),
+                    typeformbuf,
+                    None,
+                    outPos,
+                    inPos,
+                    byref(cursor),
+                    mode,
+                )
+            else:
+                ok = function(
+                    tablesString,
+                    inbuf,
+                    byref(inlen),
+                    outbuf,
+                    byref(outlen),
+                    typeformbuf,
+                    None,
+                    mode,
+                )
+            if outlenValue >= maxOutlen:
+                break
+            retry = True
+            if not ok:
+                # Some liblouis versions fail rather than truncate, so try the worst case once.
+                outlenValue = maxOutlen
+            elif inlen.value < inlenValue:
+                outlenValue = min(maxOutlen, outlenValue * 2)
+            else:
+                break
+    finally:
+        _louisLock.release()
+    if not ok:
+        return None
+    if typeformCopied:
+        copyBytes = min(typeformBytes, outlenValue * sizeof(c_ushort))
+        typeformView[:copyBytes] = memoryview(typeformbuf).cast("B")[:copyBytes]
+    return outbuf, outlen.value, inlen.value, inPos, outPos, cursor.value, typeformbuf
+
+
+def _decode(outbuf, length, raw=False):
+    """Decode the first C{length} characters of an output buffer,
+    without copying the rest of the buffer.
+    @param raw: Return the characters as C{bytes} in L{conversionEncoding}, without decoding.
+    """
+    if not _is_py3:
+        data = outbuf[: length * wideCharBytes]
+        return data if raw else data.decode(conversionEncoding, ENCODING_ERROR_HANDLER)
+    data = memoryview(outbuf).cast("B")[: length * wideCharBytes]
+    if raw:
+        return data.tobytes()
+    return _unicode_type(data, conversionEncoding, ENCODING_ERROR_HANDLER)
 
 
 def version():
@@ -219,19 +686,23 @@ def charSize():
     return liblouis.lou_charSize()
 
 
-def translate(tableList, inbuf, typeform=None, cursorPos=0, mode=0):
+def translate(tableList, inbuf, typeform=None, cursorPos=0, mode=0, raw=False):
     """Translate a string of characters, providing position information.
     @param tableList: A list of translation tables.
     @type tableList: list of str
-    @param inbuf: The string to translate.
+    @param inbuf: The string to translate, or C{bytes}-like input already in L{conversionEncoding}.
     @type inbuf: str
     @param typeform: A list of typeform constants indicating the typeform for each position in inbuf,
-        C{None} for no typeform information.
+        C{None} for no typeform information. A writable buffer of 16 bit values,
+        such as C{array('H')} or a NumPy C{uint16} array, is passed to liblouis
+        without conversion and updated in place.
     @type typeform: list of int
     @param cursorPos: The position of the cursor in inbuf.
     @type cursorPos: int
     @param mode: The translation mode; add multiple values for a combined mode.
     @type mode: int
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @return: A tuple of: the translated string,
         a list of input positions for each position in the output,
         a list of output positions for each position in the input, and
@@ -240,103 +711,143 @@ def translate(tableList, inbuf, typeform=None, cursorPos=0, mode=0):
     @raise RuntimeError: If a complete translation could not be done.
     @see: lou_translate in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    inlen = c_int(len(inbuf) // wideCharBytes)
-    outlen = c_int(inlen.value * outlenMultiplier)
-    outbuf = create_string_buffer(outlen.value * wideCharBytes)
-    typeformbuf = None
-    if typeform:
-        typeformbuf = _createTypeformbuf(outlen.value, typeform)
-    inPos = (c_int * outlen.value)()
-    outPos = (c_int * inlen.value)()
-    cursorPos = c_int(cursorPos)
-    if not liblouis.lou_translate(
+    return _translate(
+        _createTablesString(tableList),
+        tableList,
+        inbuf,
+        typeform,
+        cursorPos,
+        mode,
+        raw,
+    )
+
+
+def _translate(tablesString, tableList, inbuf, typeform, cursorPos, mode, raw=False):
+    if _cache is not None and not raw and _cacheable(inbuf):
+        return _cache.call(
+            ("translate", tablesString, inbuf, cursorPos, mode),
+            typeform,
+            _translateUncached,
+            tablesString,
+            tableList,
+            inbuf,
+            typeform,
+            cursorPos,
+            mode,
+            False,
+        )
+    return _translateUncached(
+        tablesString, tableList, inbuf, typeform, cursorPos, mode, raw
+    )
+
+
+def _translateUncached(tablesString, tableList, inbuf, typeform, cursorPos, mode, raw):
+    inbuf = _encodeInput(inbuf)
+    result = _louTranslate(
+        liblouis.lou_translate,
+        False,
+        True,
         tablesString,
         inbuf,
-        byref(inlen),
-        outbuf,
-        byref(outlen),
-        typeformbuf,
-        None,
-        outPos,
-        inPos,
-        byref(cursorPos),
+        typeform,
+        cursorPos,
         mode,
-    ):
+    )
+    if result is None:
         raise RuntimeError(
             "Can't translate: tables %s, inbuf %s, typeform %s, cursorPos %s, mode %s"
             % (tableList, inbuf, typeform, cursorPos, mode)
         )
+    outbuf, outlen, inlen, inPos, outPos, cursorPos, typeformbuf = result
     if isinstance(typeform, list):
-        typeform[:] = list(typeformbuf)
+        typeform[:] = _typeformList(typeformbuf)
     return (
-        outbuf.raw[: outlen.value * wideCharBytes].decode(
-            conversionEncoding, errors=ENCODING_ERROR_HANDLER
-        ),
-        inPos[: outlen.value],
-        outPos[: inlen.value],
-        cursorPos.value,
+        _decode(outbuf, outlen, raw),
+        inPos[:outlen],
+        outPos[:inlen],
+        cursorPos,
     )
 
 
-def translateString(tableList, inbuf, typeform=None, mode=0):
+def translateString(tableList, inbuf, typeform=None, mode=0, raw=False):
     """Translate a string of characters.
     @param tableList: A list of translation tables.
     @type tableList: list of str
-    @param inbuf: The string to translate.
+    @param inbuf: The string to translate, or C{bytes}-like input already in L{conversionEncoding}.
     @type inbuf: str
     @param typeform: A list of typeform constants indicating the typeform for each position in inbuf,
-        C{None} for no typeform information.
+        C{None} for no typeform information. A writable buffer of 16 bit values,
+        such as C{array('H')} or a NumPy C{uint16} array, is passed to liblouis
+        without conversion and updated in place.
     @type typeform: list of int
     @param mode: The translation mode; add multiple values for a combined mode.
     @type mode: int
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @return: The translated string.
     @rtype: str
     @raise RuntimeError: If a complete translation could not be done.
     @see: lou_translateString in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    inlen = c_int(len(inbuf) // wideCharBytes)
-    outlen = c_int(inlen.value * outlenMultiplier)
-    outbuf = create_string_buffer(outlen.value * wideCharBytes)
-    typeformbuf = None
-    if typeform:
-        typeformbuf = _createTypeformbuf(outlen.value, typeform)
-    if not liblouis.lou_translateString(
+    return _translateString(
+        _createTablesString(tableList), tableList, inbuf, typeform, mode, raw
+    )
+
+
+def _translateString(tablesString, tableList, inbuf, typeform, mode, raw=False):
+    if _cache is not None and not raw and _cacheable(inbuf):
+        return _cache.call(
+            ("translateString", tablesString, inbuf, mode),
+            typeform,
+            _translateStringUncached,
+            tablesString,
+            tableList,
+            inbuf,
+            typeform,
+            mode,
+            False,
+        )
+    return _translateStringUncached(tablesString, tableList, inbuf, typeform, mode, raw)
+
+
+def _translateStringUncached(tablesString, tableList, inbuf, typeform, mode, raw):
+    inbuf = _encodeInput(inbuf)
+    result = _louTranslate(
+        liblouis.lou_translateString,
+        False,
+        False,
         tablesString,
         inbuf,
-        byref(inlen),
-        outbuf,
-        byref(outlen),
-        typeformbuf,
-        None,
+        typeform,
+        0,
         mode,
-    ):
+    )
+    if result is None:
         raise RuntimeError(
             "Can't translate: tables %s, inbuf %s, typeform %s, mode %s"
             % (tableList, inbuf, typeform, mode)
         )
+    outbuf, outlen, _, _, _, _, typeformbuf = result
     if isinstance(typeform, list):
-        typeform[:] = list(typeformbuf)
-    return outbuf.raw[: outlen.value * wideCharBytes].decode(
-        conversionEncoding, errors=ENCODING_ERROR_HANDLER
-    )
+        typeform[:] = _typeformList(typeformbuf)
+    return _decode(outbuf, outlen, raw)
 
 
-def backTranslate(tableList, inbuf, typeform=None, cursorPos=0, mode=0):
+def backTranslate(tableList, inbuf, typeform=None, cursorPos=0, mode=0, raw=False):
     """Back translates a string of characters, providing position information.
     @param tableList: A list of translation tables.
     @type tableList: list of str
     @param inbuf: Braille to back translate.
     @type inbuf: str
-    @param typeform: List where typeform constants will be placed.
+    @param typeform: List where typeform constants will be placed,
+        or a writable buffer of 16 bit values to be filled in place.
     @type typeform: list
     @param cursorPos: Position of cursor.
     @type cursorPos: int
     @param mode: Translation mode.
     @type mode: int
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @return: A tuple: A string of the back translation,
         a list of input positions for each position in the output,
         a list of the output positions for each position in the input and
@@ -345,89 +856,137 @@ def backTranslate(tableList, inbuf, typeform=None, cursorPos=0, mode=0):
     @raise RuntimeError: If a complete back translation could not be done.
     @see: lou_backTranslate in the liblouis documentation.
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    inlen = c_int(len(inbuf) // wideCharBytes)
-    outlen = c_int(inlen.value * outlenMultiplier)
-    outbuf = create_string_buffer(outlen.value * wideCharBytes)
-    typeformbuf = None
-    if isinstance(typeform, list):
-        typeformbuf = _createTypeformbuf(outlen.value)
-    inPos = (c_int * outlen.value)()
-    outPos = (c_int * inlen.value)()
-    cursorPos = c_int(cursorPos)
-    if not liblouis.lou_backTranslate(
+    return _backTranslate(
+        _createTablesString(tableList),
+        tableList,
+        inbuf,
+        typeform,
+        cursorPos,
+        mode,
+        raw,
+    )
+
+
+def _backTranslate(
+    tablesString, tableList, inbuf, typeform, cursorPos, mode, raw=False
+):
+    if _cache is not None and not raw and _cacheable(inbuf):
+        return _cache.call(
+            ("backTranslate", tablesString, inbuf, cursorPos, mode),
+            typeform,
+            _backTranslateUncached,
+            tablesString,
+            tableList,
+            inbuf,
+            typeform,
+            cursorPos,
+            mode,
+            False,
+        )
+    return _backTranslateUncached(
+        tablesString,
+        tableList,
+        inbuf,
+        typeform,
+        cursorPos,
+        mode,
+        raw,
+    )
+
+
+def _backTranslateUncached(
+    tablesString, tableList, inbuf, typeform, cursorPos, mode, raw
+):
+    inbuf = _encodeInput(inbuf)
+    result = _louTranslate(
+        liblouis.lou_backTranslate,
+        True,
+        True,
         tablesString,
         inbuf,
-        byref(inlen),
-        outbuf,
-        byref(outlen),
-        typeformbuf,
-        None,
-        outPos,
-        inPos,
-        byref(cursorPos),
+        typeform,
+        cursorPos,
         mode,
-    ):
+    )
+    if result is None:
         raise RuntimeError(
             "Can't back translate: tables %s, inbuf %s, typeform %s, cursorPos %d, mode %d"
             % (tableList, inbuf, typeform, cursorPos, mode)
         )
+    outbuf, outlen, inlen, inPos, outPos, cursorPos, typeformbuf = result
     if isinstance(typeform, list):
-        typeform[:] = list(typeformbuf)
+        typeform[:] = _typeformList(typeformbuf)
     return (
-        outbuf.raw[: outlen.value * wideCharBytes].decode(
-            conversionEncoding, errors=ENCODING_ERROR_HANDLER
-        ),
-        inPos[: outlen.value],
-        outPos[: inlen.value],
-        cursorPos.value,
+        _decode(outbuf, outlen, raw),
+        inPos[:outlen],
+        outPos[:inlen],
+        cursorPos,
     )
 
 
-def backTranslateString(tableList, inbuf, typeform=None, mode=0):
+def backTranslateString(tableList, inbuf, typeform=None, mode=0, raw=False):
     """Back translate from Braille.
     @param tableList: A list of translation tables.
     @type tableList: list of str
     @param inbuf: The Braille to back translate.
     @type inbuf: str
-    @param typeform: List for typeform constants to be put in.
+    @param typeform: List for typeform constants to be put in,
+        or a writable buffer of 16 bit values to be filled in place.
         If you don't want typeform data then give None
     @type typeform: list
     @param mode: The translation mode
     @type mode: int
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @return: The back translation of inbuf.
     @rtype: str
     @raise RuntimeError: If a complete back translation could not be done.
     @see: lou_backTranslateString in the liblouis documentation.
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    inlen = c_int(len(inbuf) // wideCharBytes)
-    outlen = c_int(inlen.value * outlenMultiplier)
-    outbuf = create_string_buffer(outlen.value * wideCharBytes)
-    typeformbuf = None
-    if isinstance(typeform, list):
-        typeformbuf = _createTypeformbuf(outlen.value)
-    if not liblouis.lou_backTranslateString(
+    return _backTranslateString(
+        _createTablesString(tableList), tableList, inbuf, typeform, mode, raw
+    )
+
+
+def _backTranslateString(tablesString, tableList, inbuf, typeform, mode, raw=False):
+    if _cache is not None and not raw and _cacheable(inbuf):
+        return _cache.call(
+            ("backTranslateString", tablesString, inbuf, mode),
+            typeform,
+            _backTranslateStringUncached,
+            tablesString,
+            tableList,
+            inbuf,
+            typeform,
+            mode,
+            False,
+        )
+    return _backTranslateStringUncached(
+        tablesString, tableList, inbuf, typeform, mode, raw
+    )
+
+
+def _backTranslateStringUncached(tablesString, tableList, inbuf, typeform, mode, raw):
+    inbuf = _encodeInput(inbuf)
+    result = _louTranslate(
+        liblouis.lou_backTranslateString,
+        True,
+        False,
         tablesString,
         inbuf,
-        byref(inlen),
-        outbuf,
-        byref(outlen),
-        typeformbuf,
-        None,
+        typeform,
+        0,
         mode,
-    ):
+    )
+    if result is None:
         raise RuntimeError(
             "Can't back translate: tables %s, inbuf %s, mode %d"
             % (tableList, inbuf, mode)
         )
+    outbuf, outlen, _, _, _, _, typeformbuf = result
     if isinstance(typeform, list):
-        typeform[:] = list(typeformbuf)
-    return outbuf.raw[: outlen.value * wideCharBytes].decode(
-        conversionEncoding, errors=ENCODING_ERROR_HANDLER
-    )
+        typeform[:] = _typeformList(typeformbuf)
+    return _decode(outbuf, outlen, raw)
 
 
 def hyphenate(tableList, inbuf, mode=0):
@@ -448,11 +1007,33 @@ def hyphenate(tableList, inbuf, mode=0):
     @raise RuntimeError: If hyphenation data could not be produced.
     @see: lou_hyphenate in the liblouis documentation.
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
+    return _hyphenate(_createTablesString(tableList), tableList, inbuf, mode)
+
+
+def _hyphenate(tablesString, tableList, inbuf, mode):
+    if _cache is not None and _cacheable(inbuf):
+        return _cache.call(
+            ("hyphenate", tablesString, inbuf, mode),
+            None,
+            _hyphenateUncached,
+            tablesString,
+            tableList,
+            inbuf,
+            mode,
+        )
+    return _hyphenateUncached(tablesString, tableList, inbuf, mode)
+
+
+def _hyphenateUncached(tablesString, tableList, inbuf, mode):
+    inbuf = _encodeInput(inbuf)
     inlen = c_int(len(inbuf) // wideCharBytes)
     hyphen_string = create_string_buffer(inlen.value + 1)
-    if not liblouis.lou_hyphenate(tablesString, inbuf, inlen, hyphen_string, mode):
+    _useTables(tablesString)
+    try:
+        ok = liblouis.lou_hyphenate(tablesString, inbuf, inlen, hyphen_string, mode)
+    finally:
+        _louisLock.release()
+    if not ok:
         raise RuntimeError(
             "Can't hyphenate: tables %s, inbuf %s, mode %d" % (tableList, inbuf, mode)
         )
@@ -469,8 +1050,18 @@ def checkTable(tableList):
     @raise RuntimeError: If compilation failed.
     @see: lou_checkTable in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    if not liblouis.lou_checkTable(tablesString):
+    _checkTable(_createTablesString(tableList), tableList)
+
+
+def _checkTable(tablesString, tableList):
+    _louisLock.acquire()
+    try:
+        ok = liblouis.lou_checkTable(tablesString)
+        if ok:
+            _compiledTables.add(tablesString)
+    finally:
+        _louisLock.release()
+    if not ok:
         raise RuntimeError("Can't compile: tables %s" % tableList)
 
 
@@ -483,12 +1074,27 @@ def compileString(tableList, inString):
     @raise RuntimeError: If compilation of the entry failed.
     @see: lou_compileString in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
+    _compileString(_createTablesString(tableList), tableList, inString)
+
+
+def _compileString(tablesString, tableList, inString):
     inBytes = inString.encode("ASCII") if isinstance(inString, str) else bytes(inString)
-    if not liblouis.lou_compileString(tablesString, inBytes):
+    _louisLock.acquire()
+    try:
+        ok = liblouis.lou_compileString(tablesString, inBytes)
+        if ok:
+            _compiledTables.add(tablesString)
+    finally:
+        _louisLock.release()
+    if not ok:
         raise RuntimeError(
             "Can't compile entry: tables %s, inString %s" % (tableList, inString)
         )
+    # The tables changed, so cached results may no longer be valid.
+    if _cache is not None:
+        _cache.clear()
+    _emphClassTypeforms.clear()
+    _dotMaps.clear()
 
 
 def getTypeformForEmphClass(tableList, emphClass):
@@ -497,37 +1103,70 @@ def getTypeformForEmphClass(tableList, emphClass):
     @type tableList: list of str
     @param emphClass: An emphasis class name.
     @type emphClass: str
+    @return: The typeform bit, looked up once per table set and emphasis class.
+    @rtype: int
     @see: lou_getTypeformForEmphClass in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    if _is_py3:
-        emphClass = emphClass.encode("ASCII")
-    return liblouis.lou_getTypeformForEmphClass(tablesString, emphClass)
+    return _getTypeformForEmphClass(_createTablesString(tableList), emphClass)
+
+
+#: Typeform bits by tables string and emphasis class, cleared by L{compileString}.
+_emphClassTypeforms = {}
+
+
+def _getTypeformForEmphClass(tablesString, emphClass):
+    key = (tablesString, emphClass)
+    typeform = _emphClassTypeforms.get(key)
+    if typeform is None:
+        name = emphClass.encode("ASCII") if _is_py3 else emphClass
+        _useTables(tablesString)
+        try:
+            typeform = liblouis.lou_getTypeformForEmphClass(tablesString, name)
+        finally:
+            _louisLock.release()
+        _emphClassTypeforms[key] = typeform
+    return typeform
 
 
-def dotsToChar(tableList, inbuf):
+def dotsToChar(tableList, inbuf, raw=False):
     """"Convert a string of dot patterns to a string of characters according to the specifications in tableList.
     @param tableList: A list of translation tables.
     @type tableList: list of str
     @param inbuf: a string of dot patterns, either in liblouis format or Unicode braille.
     @type inbuf: str
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @raise RuntimeError: If a complete conversion could not be done.
+    @note: Strings are converted through a lookup map per table set, which asks
+        liblouis for each character once, the first time it is seen.
     @see: lou_dotsToChar in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    length = c_int(len(inbuf) // wideCharBytes)
-    outbuf = create_string_buffer(length.value * wideCharBytes)
-    if not liblouis.lou_dotsToChar(tablesString, inbuf, outbuf, length, 0):
+    return _dotsToChar(_createTablesString(tableList), tableList, inbuf, raw)
+
+
+def _dotsToChar(tablesString, tableList, inbuf, raw=False):
+    if not raw and isinstance(inbuf, _unicode_type):
+        return inbuf.translate(_dotMap("dotsToChar", tablesString, tableList, 0))
+    return _dotsToCharUncached(tablesString, tableList, inbuf, raw)
+
+
+def _dotsToCharUncached(tablesString, tableList, inbuf, raw):
+    inbuf = _encodeInput(inbuf)
+    length = len(inbuf) // wideCharBytes
+    outbuf = _bufferPool.get("out", c_char, length * wideCharBytes)
+    _useTables(tablesString)
+    try:
+        ok = liblouis.lou_dotsToChar(tablesString, inbuf, outbuf, length, 0)
+    finally:
+        _louisLock.release()
+    if not ok:
         raise RuntimeError(
             "Can't convert dots to char: tables %s, inbuf %s" % (tableList, inbuf)
         )
-    return outbuf.raw[: length.value * wideCharBytes].decode(
-        conversionEncoding, errors=ENCODING_ERROR_HANDLER
-    )
+    return _decode(outbuf, length, raw)
 
 
-def charToDots(tableList, inbuf, mode=0):
+def charToDots(tableList, inbuf, mode=0, raw=False):
     """"Convert a string of characterss to a string of dot patterns according to the specifications in tableList.
     @param tableList: A list of translation tables.
     @type tableList: list of str
@@ -535,21 +1174,162 @@ def charToDots(tableList, inbuf, mode=0):
     @type inbuf: str
     @param mode: The translation mode; add multiple values for a combined mode.
     @type mode: int
+    @param raw: Return the result as C{bytes} in L{conversionEncoding}, without decoding.
+    @type raw: bool
     @raise RuntimeError: If a complete conversion could not be done.
+    @note: Strings are converted through a lookup map per table set and mode,
+        which asks liblouis for each character once, the first time it is seen.
     @see: lou_charToDots in the liblouis documentation
     """
-    tablesString = _createTablesString(tableList)
-    inbuf = createEncodedByteString(inbuf)
-    length = c_int(len(inbuf) // wideCharBytes)
-    outbuf = create_string_buffer(length.value * wideCharBytes)
-    if not liblouis.lou_charToDots(tablesString, inbuf, outbuf, length, mode):
+    return _charToDots(_createTablesString(tableList), tableList, inbuf, mode, raw)
+
+
+def _charToDots(tablesString, tableList, inbuf, mode, raw=False):
+    if not raw and isinstance(inbuf, _unicode_type):
+        return inbuf.translate(_dotMap("charToDots", tablesString, tableList, mode))
+    return _charToDotsUncached(tablesString, tableList, inbuf, mode, raw)
+
+
+def _charToDotsUncached(tablesString, tableList, inbuf, mode, raw):
+    inbuf = _encodeInput(inbuf)
+    length = len(inbuf) // wideCharBytes
+    outbuf = _bufferPool.get("out", c_char, length * wideCharBytes)
+    _useTables(tablesString)
+    try:
+        ok = liblouis.lou_charToDots(tablesString, inbuf, outbuf, length, mode)
+    finally:
+        _louisLock.release()
+    if not ok:
         raise RuntimeError(
             "Can't convert char to dots: tables %s, inbuf %s, mode %d"
             % (tableList, inbuf, mode)
         )
-    return outbuf.raw[: length.value * wideCharBytes].decode(
-        conversionEncoding, errors=ENCODING_ERROR_HANDLER
-    )
+    return _decode(outbuf, length, raw)
+
+
+class _DotMap(dict):
+    """Code point to cells or characters, for C{unicode.translate}.
+    liblouis converts every character on its own in L{charToDots} and
+    L{dotsToChar}, so a character is looked up the first time it is seen
+    and served from the map after that.
+    """
+
+    __slots__ = ("convert",)
+
+    def __init__(self, convert):
+        self.convert = convert
+
+    def __missing__(self, code):
+        value = self.convert(_unichr(code))
+        self[code] = value
+        return value
+
+
+#: Lookup maps by conversion, tables string and mode, cleared by L{compileString}.
+_dotMaps = {}
+
+
+def _dotMap(conversion, tablesString, tableList, mode):
+    key = (conversion, tablesString, mode)
+    dotMap = _dotMaps.get(key)
+    if dotMap is None:
+        if conversion == "charToDots":
+            convert = lambda c: _charToDotsUncached(
+                tablesString, tableList, c, mode, False
+            )
+        else:
+            convert = lambda c: _dotsToCharUncached(tablesString, tableList, c, False)
+        dotMap = _dotMaps.setdefault(key, _DotMap(convert))
+    return dotMap
+
+
+def translateMany(tableList, inbufs, mode=0):
+    """Translate many strings of characters with the same tables and mode.
+    The tables string is encoded once and the pooled buffers are shared
+    by every string in the batch.
+    @param tableList: A list of translation tables.
+    @type tableList: list of str
+    @param inbufs: The strings to translate.
+    @type inbufs: iterable of str
+    @param mode: The translation mode; add multiple values for a combined mode.
+    @type mode: int
+    @return: The translated strings, in the order of C{inbufs}.
+    @rtype: list of str
+    @raise RuntimeError: If a complete translation could not be done.
+    @see: L{translateString}
+    """
+    return _translateMany(_createTablesString(tableList), tableList, inbufs, mode)
+
+
+def _translateMany(tablesString, tableList, inbufs, mode):
+    lou_translateString = liblouis.lou_translateString
+    cache = _cache
+    results = []
+    for text in inbufs:
+        key = None
+        if cache is not None and _cacheable(text):
+            key = ("translateString", tablesString, text, mode)
+            cached = cache.get(key)
+            if cached is not TranslationCache._missing:
+                results.append(cached[0])
+                continue
+        inbuf = _encodeInput(text)
+        result = _louTranslate(
+            lou_translateString, False, False, tablesString, inbuf, None, 0, mode
+        )
+        if result is None:
+            raise RuntimeError(
+                "Can't translate: tables %s, inbuf %s, mode %s"
+                % (tableList, inbuf, mode)
+            )
+        result = _decode(result[0], result[1])
+        if key is not None:
+            cache.put(key, (result, None))
+        results.append(result)
+    return results
+
+
+def charToDotsMany(tableList, inbufs, mode=0):
+    """Convert many strings of characters to strings of dot patterns.
+    The tables string is encoded once and the pooled output buffer is shared
+    by every string in the batch.
+    @param tableList: A list of translation tables.
+    @type tableList: list of str
+    @param inbufs: The strings of characters.
+    @type inbufs: iterable of str
+    @param mode: The translation mode; add multiple values for a combined mode.
+    @type mode: int
+    @return: The dot patterns, in the order of C{inbufs}.
+    @rtype: list of str
+    @raise RuntimeError: If a complete conversion could not be done.
+    @see: L{charToDots}
+    """
+    return _charToDotsMany(_createTablesString(tableList), tableList, inbufs, mode)
+
+
+def _charToDotsMany(tablesString, tableList, inbufs, mode):
+    lou_charToDots = liblouis.lou_charToDots
+    dotMap = _dotMap("charToDots", tablesString, tableList, mode)
+    results = []
+    for text in inbufs:
+        if isinstance(text, _unicode_type):
+            results.append(text.translate(dotMap))
+            continue
+        inbuf = _encodeInput(text)
+        length = len(inbuf) // wideCharBytes
+        outbuf = _bufferPool.get("out", c_char, length * wideCharBytes)
+        _useTables(tablesString)
+        try:
+            ok = lou_charToDots(tablesString, inbuf, outbuf, length, mode)
+        finally:
+            _louisLock.release()
+        if not ok:
+            raise RuntimeError(
+                "Can't convert char to dots: tables %s, inbuf %s, mode %d"
+                % (tableList, inbuf, mode)
+            )
+        results.append(_decode(outbuf, length))
+    return results
 
 
 def registerLogCallback(logCallback):
@@ -575,7 +1355,11 @@ def registerLogCallback(logCallback):
         raise TypeError(
             "logCallback should be of type {} or NoneType".format(LogCallback.__name__)
         )
-    return liblouis.lou_registerLogCallback(logCallback)
+    _louisLock.acquire()
+    try:
+        return liblouis.lou_registerLogCallback(logCallback)
+    finally:
+        _louisLock.release()
 
 
 def setLogLevel(level):
@@ -586,7 +1370,234 @@ def setLogLevel(level):
     """
     if level not in logLevels:
         raise ValueError("Level %d is an invalid log level" % level)
-    return liblouis.lou_setLogLevel(level)
+    _louisLock.acquire()
+    try:
+        return liblouis.lou_setLogLevel(level)
+    finally:
+        _louisLock.release()
+
+
+class Translator(object):
+    """A reusable handle on a fixed set of translation tables.
+    The tables string is encoded and the tables are checked and compiled
+    once, when the handle is created, so later calls only pay for the
+    translation itself.
+    The methods mirror the module level functions of the same name, without
+    the C{tableList} argument. Their C{mode} defaults to the mode
+    given to the constructor.
+    """
+
+    #: Text used to warm up the tables after they have been compiled.
+    #: @type: str
+    warmUpText = "The quick brown fox jumps over the lazy dog 0123456789."
+
+    def __init__(self, tableList, mode=0, warmUp=True):
+        """
+        @param tableList: A list of translation tables.
+        @type tableList: list of str
+        @param mode: The default translation mode for this handle.
+        @type mode: int
+        @param warmUp: Whether to run a short translation after the table check,
+            so the first real translation doesn't pay for the table setup.
+        @type warmUp: bool
+        @raise RuntimeError: If the tables could not be compiled.
+        """
+        self.tableList = list(tableList)
+        self.tablesString = _createTablesString(self.tableList)
+        self.mode = mode
+        _checkTable(self.tablesString, self.tableList)
+        if warmUp:
+            self.warmUp()
+
+    def __repr__(self):
+        return "%s(%r, mode=%d)" % (type(self).__name__, self.tableList, self.mode)
+
+    def _mode(self, mode):
+        return self.mode if mode is None else mode
+
+    def warmUp(self):
+        """Run the translation paths once so their setup cost is paid up front."""
+        _translateString(
+            self.tablesString, self.tableList, self.warmUpText, None, self.mode
+        )
+        _charToDots(self.tablesString, self.tableList, self.warmUpText, self.mode)
+
+    def translate(self, inbuf, typeform=None, cursorPos=0, mode=None, raw=False):
+        """@see: L{translate}"""
+        return _translate(
+            self.tablesString,
+            self.tableList,
+            inbuf,
+            typeform,
+            cursorPos,
+            self._mode(mode),
+            raw,
+        )
+
+    def translateString(self, inbuf, typeform=None, mode=None, raw=False):
+        """@see: L{translateString}"""
+        return _translateString(
+            self.tablesString, self.tableList, inbuf, typeform, self._mode(mode), raw
+        )
+
+    def backTranslate(self, inbuf, typeform=None, cursorPos=0, mode=None, raw=False):
+        """@see: L{backTranslate}"""
+        return _backTranslate(
+            self.tablesString,
+            self.tableList,
+            inbuf,
+            typeform,
+            cursorPos,
+            self._mode(mode),
+            raw,
+        )
+
+    def backTranslateString(self, inbuf, typeform=None, mode=None, raw=False):
+        """@see: L{backTranslateString}"""
+        return _backTranslateString(
+            self.tablesString, self.tableList, inbuf, typeform, self._mode(mode), raw
+        )
+
+    def hyphenate(self, inbuf, mode=0):
+        """@see: L{hyphenate}"""
+        return _hyphenate(self.tablesString, self.tableList, inbuf, mode)
+
+    def compileString(self, inString):
+        """@see: L{compileString}"""
+        _compileString(self.tablesString, self.tableList, inString)
+
+    def getTypeformForEmphClass(self, emphClass):
+        """@see: L{getTypeformForEmphClass}"""
+        return _getTypeformForEmphClass(self.tablesString, emphClass)
+
+    def dotsToChar(self, inbuf, raw=False):
+        """@see: L{dotsToChar}"""
+        return _dotsToChar(self.tablesString, self.tableList, inbuf, raw)
+
+    def charToDots(self, inbuf, mode=None, raw=False):
+        """@see: L{charToDots}"""
+        return _charToDots(
+            self.tablesString, self.tableList, inbuf, self._mode(mode), raw
+        )
+
+    def translateMany(self, inbufs, mode=None):
+        """@see: L{translateMany}"""
+        return _translateMany(
+            self.tablesString, self.tableList, inbufs, self._mode(mode)
+        )
+
+    def charToDotsMany(self, inbufs, mode=None):
+        """@see: L{charToDotsMany}"""
+        return _charToDotsMany(
+            self.tablesString, self.tableList, inbufs, self._mode(mode)
+        )
+
+
+class TranslationExecutor(object):
+    """Runs translations for one set of tables on one background thread.
+    liblouis is not reentrant, so every call into it, from any thread, is
+    serialized by the module's liblouis lock, and more threads wouldn't make
+    translations faster. The executor is for keeping translations off a
+    thread that must stay responsive, such as an event loop or a UI thread.
+    The translation methods submit a call and return a C{concurrent.futures.Future},
+    L{asyncCall} does the same for asyncio.
+    """
+
+    def __init__(self, tableList, mode=0, warmUp=True):
+        """
+        @param tableList: A list of translation tables.
+        @type tableList: list of str
+        @param mode: The default translation mode.
+        @type mode: int
+        @param warmUp: Whether to warm up the tables and the buffers of the thread
+            before returning.
+        @type warmUp: bool
+        @raise RuntimeError: If the tables could not be compiled.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.translator = Translator(tableList, mode, warmUp=False)
+        self._pool = ThreadPoolExecutor(1)
+        if warmUp:
+            self._pool.submit(self.translator.warmUp).result()
+
+    def __repr__(self):
+        return "%s(%r, mode=%d)" % (
+            type(self).__name__,
+            self.translator.tableList,
+            self.translator.mode,
+        )
+
+    def submit(self, method, *args, **kwargs):
+        """Run a L{Translator} method on the pool.
+        @param method: The method name, such as C{"translateString"}.
+        @type method: str
+        @return: The future of the method's result.
+        @rtype: concurrent.futures.Future
+        """
+        return self._pool.submit(getattr(self.translator, method), *args, **kwargs)
+
+    def asyncCall(self, method, *args, **kwargs):
+        """Like L{submit}, as an asyncio future of the running event loop.
+        @rtype: asyncio.Future
+        """
+        import asyncio
+
+        return asyncio.wrap_future(self.submit(method, *args, **kwargs))
+
+    def translate(self, inbuf, typeform=None, cursorPos=0, mode=None):
+        """@see: L{translate}"""
+        return self.submit("translate", inbuf, typeform, cursorPos, mode)
+
+    def translateString(self, inbuf, typeform=None, mode=None):
+        """@see: L{translateString}"""
+        return self.submit("translateString", inbuf, typeform, mode)
+
+    def backTranslate(self, inbuf, typeform=None, cursorPos=0, mode=None):
+        """@see: L{backTranslate}"""
+        return self.submit("backTranslate", inbuf, typeform, cursorPos, mode)
+
+    def backTranslateString(self, inbuf, typeform=None, mode=None):
+        """@see: L{backTranslateString}"""
+        return self.submit("backTranslateString", inbuf, typeform, mode)
+
+    def hyphenate(self, inbuf, mode=0):
+        """@see: L{hyphenate}"""
+        return self.submit("hyphenate", inbuf, mode)
+
+    def dotsToChar(self, inbuf):
+        """@see: L{dotsToChar}"""
+        return self.submit("dotsToChar", inbuf)
+
+    def charToDots(self, inbuf, mode=None):
+        """@see: L{charToDots}"""
+        return self.submit("charToDots", inbuf, mode)
+
+    def translateMany(self, inbufs, mode=None):
+        """@see: L{translateMany}"""
+        return self.submit("translateMany", inbufs, mode)
+
+    def charToDotsMany(self, inbufs, mode=None):
+        """@see: L{charToDotsMany}"""
+        return self.submit("charToDotsMany", inbufs, mode)
+
+    def compileString(self, inString):
+        """Add a table entry, once the liblouis call in progress is done.
+        Runs on the calling thread and returns when the entry is compiled.
+        @see: L{compileString}
+        """
+        self.translator.compileString(inString)
+
+    def shutdown(self, wait=True):
+        """Stop the threads once the submitted calls are done."""
+        self._pool.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
 
 
 # { Typeforms
@@ -629,6 +1640,10 @@ LOG_OFF = 60000
 
 logLevels = (LOG_ALL, LOG_DEBUG, LOG_INFO, LOG_WARN, LOG_ERROR, LOG_FATAL, LOG_OFF)
 
+# Module __getattr__ needs Python 3.7, older versions load liblouis right away.
+if version_info < (3, 7):
+    _loadLibrary()
+
 if __name__ == "__main__":
     # Just some common tests.
     print(version())
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import concurrent.futures
+import ctypes
+import json
+import louis
+import metrics
+import os
+import socket
+import struct
+import sys
+import time
+
+# translation daemon: keeps the tables loaded and warm and serves local clients over a UNIX socket
+# every message is a 4 byte big-endian length followed by that many bytes of UTF-8 JSON
+# requests: {"id": 1, "op": "translate", "text": "...", "mode": 64}, mode is optional
+# replies: {"id": 1, "result": "..."} or {"id": 1, "error": "..."}
+frameHeader = struct.Struct('>I')
+# larger frames are refused, so one client can't make the daemon buffer without limit
+maxFrame = 4 * 1024 * 1024
+
+def defaultSocket():
+    directory = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(directory, 'touchtype-louis-%d.sock' % os.getuid())
+
+class Daemon:
+    def __init__(self, translator, path):
+        self.translator = translator
+        self.path = path
+        # liblouis isn't reentrant, every translation runs on this one thread, in arrival order,
+        # and the event loop stays free to read and answer other clients meanwhile
+        self.worker = concurrent.futures.ThreadPoolExecutor(1)
+        self.latency = metrics.Metrics()
+        self.latency.enable()
+        self.clients = 0
+        self.operations = {
+            'translate': lambda text, mode: translator.translateString(text, mode=mode),
+            'backTranslate': lambda text, mode: translator.backTranslateString(text, mode=mode),
+            'charToDots': lambda text, mode: translator.charToDots(text, mode=mode),
+            'dotsToChar': lambda text, mode: translator.dotsToChar(text),
+        }
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        print('Serving %r on %s' % (self.translator, self.path))
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        # requests on one connection are answered in order, one at a time, and replies are
+        # drained before the next request is read, so a slow client only holds up itself
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(frameHeader.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = frameHeader.unpack(header)
+                if length > maxFrame:
+                    await self.send(writer, {'error': 'frame of %d bytes is over the %d byte limit' % (length, maxFrame)})
+                    break
+                request = await reader.readexactly(length)
+                await self.send(writer, await self.answer(request))
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def answer(self, data):
+        start = time.perf_counter()
+        try:
+            request = json.loads(data.decode('utf-8'))
+        except ValueError as e:
+            return {'error': 'bad request: %s' % e}
+        if not isinstance(request, dict):
+            return {'error': 'bad request: expected a JSON object'}
+        op = request.get('op')
+        reply = {'id': request.get('id')}
+        if op == 'stats':
+            reply['result'] = self.stats()
+            return reply
+        operation = self.operations.get(op)
+        if operation is None:
+            reply['error'] = 'unknown op %r' % op
+            return reply
+        text = request.get('text', '')
+        mode = request.get('mode')
+        # checked here, louis would turn any text into a string and fail on a bad mode in ctypes
+        if not isinstance(text, str):
+            reply['error'] = 'bad request: text must be a string'
+            return reply
+        if mode is not None and (not isinstance(mode, int) or isinstance(mode, bool)):
+            reply['error'] = 'bad request: mode must be an integer'
+            return reply
+        try:
+            loop = asyncio.get_running_loop()
+            reply['result'] = await loop.run_in_executor(self.worker, operation, text, mode)
+        except (RuntimeError, ValueError, TypeError, ctypes.ArgumentError) as e:
+            reply['error'] = str(e)
+        self.latency.observe(op, time.perf_counter() - start)
+        self.latency.count(op)
+        return reply
+
+    async def send(self, writer, reply):
+        data = json.dumps(reply).encode('utf-8')
+        writer.write(frameHeader.pack(len(data)) + data)
+        await writer.drain()
+
+    def stats(self):
+        snapshot = self.latency.snapshot()
+        return {
+            'clients': self.clients,
+            'requests': snapshot['counters'],
+            'latency': {op: {key: stage[key] for key in ('count', 'p50_s', 'p95_s', 'p99_s', 'max_s')} for op, stage in snapshot['stages'].items()},
+        }
+
+class Client:
+    # blocking client, for shell hooks and scripts
+    def __init__(self, path=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path or defaultSocket())
+        self.nextId = 0
+
+    def request(self, op, text='', mode=None):
+        self.nextId += 1
+        message = {'id': self.nextId, 'op': op, 'text': text}
+        if mode is not None:
+            message['mode'] = mode
+        data = json.dumps(message).encode('utf-8')
+        self.socket.sendall(frameHeader.pack(len(data)) + data)
+        (length,) = frameHeader.unpack(self.receive(frameHeader.size))
+        reply = json.loads(self.receive(length).decode('utf-8'))
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def receive(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('daemon closed the connection')
+            data += chunk
+        return data
+
+    def translate(self, text, mode=None):
+        return self.request('translate', text, mode)
+
+    def backTranslate(self, text, mode=None):
+        return self.request('backTranslate', text, mode)
+
+    def charToDots(self, text, mode=None):
+        return self.request('charToDots', text, mode)
+
+    def dotsToChar(self, text):
+        return self.request('dotsToChar', text)
+
+    def stats(self):
+        return self.request('stats')
+
+    def close(self):
+        self.socket.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Translation daemon over a UNIX socket.')
+    parser.add_argument('--socket', default=defaultSocket(), help='socket path')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serveParser = commands.add_parser('serve', help='run the daemon')
+    serveParser.add_argument('--tables', default='./en-ueb-g2.ctb', help='comma separated translation tables')
+    serveParser.add_argument('--mode', type=int, default=louis.ucBrl | louis.noUndefined, help='default translation mode')
+    for op in ('translate', 'backTranslate', 'charToDots', 'dotsToChar'):
+        opParser = commands.add_parser(op, help='%s text with a running daemon, stdin by default' % op)
+        opParser.add_argument('text', nargs='?')
+    commands.add_parser('stats', help='show request counts and latency of a running daemon')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        translator = louis.Translator(args.tables.encode().split(b','), mode=args.mode)
+        try:
+            asyncio.run(Daemon(translator, args.socket).serve())
+        except KeyboardInterrupt:
+            pass
+        return
+    client = Client(args.socket)
+    if args.command == 'stats':
+        print(json.dumps(client.stats(), indent=2))
+    else:
+        text = args.text if args.text is not None else sys.stdin.read()
+        print(client.request(args.command, text))
+    client.close()
+
+if __name__ == '__main__':
+    main()
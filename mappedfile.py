@@ -0,0 +1,44 @@
+import json
+import mmap
+import os
+import struct
+
+# files built ahead of time and read through a memory map: the braille dictionaries and the
+# compiled documents
+# layout: magic, header length (uint32, native byte order), JSON header with the format version,
+# padding to 4 bytes, then the sections of the file
+
+def write(path, magic, header, sections):
+    # sections are bytes, or arrays written with tofile, returns the size of the file
+    header = json.dumps(header).encode('utf-8')
+    prefix = magic + struct.pack('=I', len(header)) + header
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(prefix + b'\0' * (-len(prefix) % 4))
+        for section in sections:
+            if hasattr(section, 'tofile'):
+                section.tofile(f)
+            else:
+                f.write(section)
+    # replaced in one step, so a reader never maps a half written file
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+def read(path, magic, formatVersion, kind):
+    # maps path, returns the map, the header and the offset of the first section
+    # raises ValueError if it isn't a kind file of this format version
+    with open(path, 'rb') as f:
+        map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if map[:len(magic)] != magic:
+            raise ValueError('%s is not a %s' % (path, kind))
+        start = len(magic) + 4
+        (headerLength,) = struct.unpack_from('=I', map, len(magic))
+        header = json.loads(map[start:start + headerLength].decode('utf-8'))
+        if header['version'] != formatVersion:
+            raise ValueError('%s has %s format %s, expected %d' % (path, kind, header['version'], formatVersion))
+    except ValueError:
+        map.close()
+        raise
+    offset = start + headerLength
+    return map, header, offset + -offset % 4
@@ -0,0 +1,261 @@
+import bisect
+import collections
+import threading
+import time
+
+# histogram bucket upper bounds, in seconds
+buckets = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    # latency histogram with fixed buckets, the last count is for everything slower
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th quantile, at most the slowest value seen
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(buckets[i], self.max) if i < len(buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum_s': self.sum,
+            'max_s': self.max,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+            'p99_s': self.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in buckets] + ['+Inf'], self.counts)),
+        }
+
+class NullStage:
+    # what stage() hands out while disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+nullStage = NullStage()
+
+class Stage:
+    __slots__ = ('histogram', 'lock', 'start')
+
+    def __init__(self, histogram, lock):
+        self.histogram = histogram
+        self.lock = lock
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            self.histogram.observe(elapsed)
+        return False
+
+class Metrics:
+    # per-stage latency histograms, counters and captured liblouis log events
+    # disabled, stage() and count() do nothing and louis is left unwrapped
+    # updates take the lock too: stages run on the compile and read ahead threads, and an update
+    # adding a name while snapshot() iterates would break it
+    def __init__(self, logSize=100):
+        self.enabled = False
+        self.histograms = collections.defaultdict(Histogram)
+        self.counters = collections.Counter()
+        self.logLevels = collections.Counter()
+        self.log = collections.deque(maxlen=logSize)
+        self.lock = threading.Lock()
+        self.originals = {}
+        self.logCallback = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.uninstrumentLouis()
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.logLevels.clear()
+            self.log.clear()
+
+    def stage(self, name):
+        if not self.enabled:
+            return nullStage
+        with self.lock:
+            return Stage(self.histograms[name], self.lock)
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            with self.lock:
+                self.histograms[name].observe(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += n
+
+    def timed(self, name, func):
+        # wraps func so every call is timed under name and counted
+        lock = self.lock
+        with lock:
+            histogram = self.histograms[name]
+        counters = self.counters
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with lock:
+                    histogram.observe(elapsed)
+                    counters[name + '.calls'] += 1
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def instrumentLouis(self):
+        # swaps timing wrappers into the louis module: every translation helper, the input
+        # encoding, the output decoding and the liblouis entry points; nothing is wrapped until
+        # this is called
+        import louis
+        if self.originals:
+            return
+        lock = self.lock
+        counters = self.counters
+        wide = louis.wideCharBytes
+        for name in ('_translate', '_translateString', '_backTranslate', '_backTranslateString', '_hyphenate', '_charToDots', '_dotsToChar', '_translateMany', '_charToDotsMany', '_checkTable', '_compileString'):
+            func = getattr(louis, name)
+            self.originals[name] = func
+            setattr(louis, name, self.countOutput('louis.' + name[1:], self.timed('louis.' + name[1:], func), wide))
+        encode = louis._encodeInput
+        self.originals['_encodeInput'] = encode
+        timedEncode = self.timed('louis.encode', encode)
+        def countedEncode(*args, **kwargs):
+            data = timedEncode(*args, **kwargs)
+            with lock:
+                counters['louis.bytes_in'] += len(data)
+            return data
+        louis._encodeInput = countedEncode
+        self.originals['_decode'] = louis._decode
+        louis._decode = self.timed('louis.decode', louis._decode)
+        for name in ('lou_translate', 'lou_translateString', 'lou_backTranslate', 'lou_backTranslateString', 'lou_hyphenate', 'lou_charToDots', 'lou_dotsToChar', 'lou_checkTable', 'lou_compileString'):
+            func = getattr(louis.liblouis, name)
+            self.originals['liblouis.' + name] = func
+            setattr(louis.liblouis, name, self.timed('liblouis.' + name, func))
+
+    def countOutput(self, name, func, wide):
+        lock = self.lock
+        counters = self.counters
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            output = result[0] if isinstance(result, tuple) else result
+            if isinstance(output, list):
+                size = sum(len(item) for item in output) * wide
+            elif isinstance(output, str):
+                size = len(output) * wide
+            elif isinstance(output, bytes):
+                size = len(output)
+            else:
+                return result
+            with lock:
+                counters['louis.bytes_out'] += size
+            return result
+        return wrapper
+
+    def uninstrumentLouis(self):
+        if not self.originals:
+            return
+        import louis
+        for name, func in self.originals.items():
+            if name.startswith('liblouis.'):
+                setattr(louis.liblouis, name[len('liblouis.'):], func)
+            else:
+                setattr(louis, name, func)
+        self.originals = {}
+
+    def captureLouisLog(self, level=None):
+        # records liblouis log messages through registerLogCallback
+        import louis
+        def onLog(level, message):
+            with self.lock:
+                self.logLevels[level] += 1
+                self.log.append((time.time(), level, message.decode('ASCII', 'replace')))
+        # kept on self so the C callback isn't garbage collected
+        self.logCallback = louis.LogCallback(onLog)
+        louis.registerLogCallback(self.logCallback)
+        if level is not None:
+            louis.setLogLevel(level)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'stages': {name: histogram.snapshot() for name, histogram in self.histograms.items() if histogram.count},
+                'counters': dict(self.counters),
+                'louis_log': {
+                    'levels': {str(level): count for level, count in self.logLevels.items()},
+                    'recent': [{'time': when, 'level': level, 'message': message} for when, level, message in self.log],
+                },
+            }
+
+    def toJson(self):
+        # json pulls in re, only pay for it when writing metrics out
+        import json
+        return json.dumps(self.snapshot(), indent=2)
+
+    def toPrometheus(self, prefix='touchtype'):
+        lines = []
+        lines.append('# TYPE %s_stage_seconds histogram' % prefix)
+        for name, histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            seen = 0
+            for bound, count in zip([repr(bound) for bound in buckets] + ['+Inf'], histogram.counts):
+                seen += count
+                lines.append('%s_stage_seconds_bucket{stage="%s",le="%s"} %d' % (prefix, name, bound, seen))
+            lines.append('%s_stage_seconds_sum{stage="%s"} %r' % (prefix, name, histogram.sum))
+            lines.append('%s_stage_seconds_count{stage="%s"} %d' % (prefix, name, histogram.count))
+        lines.append('# TYPE %s_count_total counter' % prefix)
+        for name, value in sorted(self.counters.items()):
+            lines.append('%s_count_total{name="%s"} %d' % (prefix, name, value))
+        lines.append('# TYPE %s_louis_log_total counter' % prefix)
+        for level, value in sorted(self.logLevels.items()):
+            lines.append('%s_louis_log_total{level="%d"} %d' % (prefix, level, value))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # Prometheus text format for .prom files, JSON otherwise
+        data = self.toPrometheus() if path.endswith('.prom') else self.toJson() + '\n'
+        with open(path, 'w') as f:
+            f.write(data)
+
+# the metrics shared by touchtype and the modules it uses
+registry = Metrics()
+
+def stage(name):
+    return registry.stage(name)
+
+def count(name, n=1):
+    registry.count(name, n)
@@ -0,0 +1,325 @@
+import collections
+import queue
+import threading
+
+# navigation commands
+NEXT = 'next'
+PREVIOUS = 'previous'
+FIRST = 'first'
+LAST = 'last'
+QUIT = 'quit'
+
+# default key bindings, by keyboard module key name
+keyMap = {'n': NEXT, 'p': PREVIOUS, 'home': FIRST, 'end': LAST, 'q': QUIT}
+
+# same shape as keyboard.KeyboardEvent, for the parts used here
+KeyEvent = collections.namedtuple('KeyEvent', ['event_type', 'name'])
+
+class KeyEvents:
+    # turns key events into navigation commands on a queue
+    # a held key only counts once, so auto-repeat from a long press can't skip pages
+    def __init__(self, keyMap=keyMap):
+        self.keyMap = keyMap
+        self.commands = queue.Queue()
+        self.held = set()
+
+    def onEvent(self, event):
+        if event.event_type == 'up':
+            self.held.discard(event.name)
+            return
+        if event.name in self.held:
+            return
+        self.held.add(event.name)
+        command = self.keyMap.get(event.name)
+        if command is not None:
+            self.commands.put(command)
+
+    def get(self):
+        # blocks without using any CPU until a command arrives
+        return self.commands.get()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class KeyboardEvents(KeyEvents):
+    # key events from the real keyboard, through a keyboard module hook
+    def __init__(self, keyMap=keyMap):
+        super().__init__(keyMap)
+        self.hook = None
+
+    def start(self):
+        import keyboard
+        self.hook = keyboard.hook(self.onEvent)
+
+    def stop(self):
+        import keyboard
+        if self.hook is not None:
+            keyboard.unhook(self.hook)
+            self.hook = None
+
+class SyntheticEvents(KeyEvents):
+    # key events from a script of key names, for driving navigation without a keyboard
+    # quits once the script runs out
+    def __init__(self, keys, keyMap=keyMap):
+        super().__init__(keyMap)
+        self.keys = list(keys)
+
+    def start(self):
+        for name in self.keys:
+            self.press(name)
+        self.commands.put(QUIT)
+
+    def press(self, name, repeats=1):
+        # repeats > 1 simulates auto-repeat while the key is held down
+        for _ in range(repeats):
+            self.onEvent(KeyEvent('down', name))
+        self.onEvent(KeyEvent('up', name))
+
+class StreamPages:
+    # indexable view of a page iterator that keeps only the last `history` pages
+    # safe to use from two threads: pages it holds are served without waiting for a read of
+    # the iterator in progress on the other thread
+    def __init__(self, pages, history=100):
+        self.pages = iter(pages)
+        self.cache = collections.deque(maxlen=history)
+        self.start = 0
+        self.done = False
+        # lock guards cache and start and is never held while reading, reading is one read at a time
+        self.lock = threading.Lock()
+        self.reading = threading.Lock()
+
+    def fill(self, n):
+        # pulls pages until page n is cached or the iterator runs out
+        with self.reading:
+            while not self.done and self.start + len(self.cache) <= n:
+                page = next(self.pages, None)
+                with self.lock:
+                    if page is None:
+                        self.done = True
+                        break
+                    if len(self.cache) == self.cache.maxlen:
+                        self.start = self.start + 1
+                    self.cache.append(page)
+
+    def held(self, n):
+        # page n if it's cached, None otherwise, without reading
+        with self.lock:
+            if self.start <= n < self.start + len(self.cache):
+                return self.cache[n - self.start]
+        return None
+
+    def __getitem__(self, n):
+        page = self.held(n)
+        if page is not None:
+            return page
+        self.fill(n)
+        page = self.held(n)
+        if page is None:
+            raise IndexError(n)
+        return page
+
+    def first(self):
+        with self.lock:
+            return self.start
+
+    def last(self):
+        while not self.done:
+            self.fill(self.start + len(self.cache))
+        with self.lock:
+            return self.start + len(self.cache) - 1
+
+class SequencePages:
+    # the same interface over a list of pages
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __getitem__(self, n):
+        if n < 0:
+            raise IndexError(n)
+        return self.pages[n]
+
+    def first(self):
+        return 0
+
+    def last(self):
+        return len(self.pages) - 1
+
+class ReadAhead:
+    # page source that prepares the next `ahead` pages on a background thread while the
+    # current one is read, and keeps the previous `behind` pages, so page turns come from memory
+    # format(page) is applied to every page as it is prepared, e.g. to turn cells into masks
+    # only pages within `behind` before and `ahead` after the current page are kept; a jump
+    # drops the rest and the work in progress for them
+    # pages is indexed from both threads, StreamPages, SequencePages and PageIndex allow that
+    def __init__(self, pages, ahead=4, behind=4, format=None):
+        self.pages = pages
+        self.ahead = ahead
+        self.behind = behind
+        self.format = format
+        self.ready = {}
+        # what preparing a page raised in the background, raised again when the page is shown
+        self.errors = {}
+        # pages that were shown, pages that were prepared and dropped unread count as wasted
+        self.shown = set()
+        self.current = 0
+        # first page number past the end once the source ran out, and the first page a stream still keeps
+        self.end = None
+        self.start = 0
+        self.closed = False
+        self.counters = collections.Counter()
+        self.condition = threading.Condition()
+        # whether the worker is preparing a page, which may be waiting on a read of the stream
+        self.busy = False
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def prepare(self, n):
+        page = self.pages[n]
+        return page if self.format is None else self.format(page)
+
+    def __getitem__(self, n):
+        with self.condition:
+            page = self.ready.get(n)
+            error = self.errors.get(n)
+        if error is not None:
+            raise error
+        hit = page is not None
+        if not hit:
+            # raises IndexError past either end, like the source
+            page = self.prepare(n)
+        with self.condition:
+            self.counters['hits' if hit else 'misses'] += 1
+            if abs(n - self.current) > 1:
+                self.counters['jumps'] += 1
+            self.current = n
+            self.shown.add(n)
+            self.ready[n] = page
+            for old in [old for old in self.ready if not n - self.behind <= old <= n + self.ahead]:
+                del self.ready[old]
+                if old not in self.shown:
+                    self.counters['wasted'] += 1
+            # failed pages out of range are tried again once they are wanted
+            for old in [old for old in self.errors if not n - self.behind <= old <= n + self.ahead]:
+                del self.errors[old]
+            self.shown.intersection_update(self.ready)
+            self.condition.notify()
+        return page
+
+    def wanted(self):
+        # next page to prepare: the pages ahead first, then the ones behind
+        n = self.current
+        for m in list(range(n + 1, n + self.ahead + 1)) + list(range(n - 1, n - self.behind - 1, -1)):
+            if m >= self.start and m not in self.ready and m not in self.errors and (self.end is None or m < self.end):
+                return m
+        return None
+
+    def work(self):
+        while True:
+            with self.condition:
+                n = self.wanted()
+                while not self.closed and n is None:
+                    self.condition.wait()
+                    n = self.wanted()
+                if self.closed:
+                    return
+                self.busy = True
+            try:
+                page = self.prepare(n)
+            except IndexError:
+                with self.condition:
+                    self.busy = False
+                    if n > self.current:
+                        self.end = n if self.end is None else min(self.end, n)
+                    else:
+                        self.start = max(self.start, n + 1)
+                continue
+            except Exception as e:
+                # e.g. the tables failed to compile or stdin isn't valid text, the worker goes
+                # on with other pages and the page raises this when it is shown
+                with self.condition:
+                    self.busy = False
+                    self.counters['errors'] += 1
+                    self.errors[n] = e
+                continue
+            with self.condition:
+                self.busy = False
+                self.counters['prepared'] += 1
+                # the user jumped away while it was being prepared
+                if not self.current - self.behind <= n <= self.current + self.ahead:
+                    self.counters['wasted'] += 1
+                else:
+                    self.ready[n] = page
+
+    def first(self):
+        return self.pages.first()
+
+    def last(self):
+        return self.pages.last()
+
+    def stats(self):
+        # hit rate of page turns and background pages prepared for nothing, for tuning ahead and behind
+        with self.condition:
+            stats = dict(self.counters)
+        turns = stats.get('hits', 0) + stats.get('misses', 0)
+        stats['hit_rate'] = stats.get('hits', 0) / turns if turns else 0.0
+        return stats
+
+    def close(self):
+        # doesn't wait for a read in progress, it may never end on an open pipe; the worker is
+        # a daemon thread and stops once the read returns
+        with self.condition:
+            self.closed = True
+            busy = self.busy
+            self.condition.notify()
+        if not busy:
+            self.worker.join()
+
+class Navigator:
+    # shows one page at a time and moves between pages as commands arrive
+    def __init__(self, pages, show, events):
+        if hasattr(pages, 'first'):
+            self.pages = pages
+        elif hasattr(pages, '__len__'):
+            self.pages = SequencePages(pages)
+        else:
+            self.pages = StreamPages(pages)
+        self.show = show
+        self.events = events
+        self.n = 0
+
+    def run(self):
+        self.events.start()
+        try:
+            if not self.goTo(0):
+                return
+            while True:
+                command = self.events.get()
+                if command == QUIT:
+                    break
+                self.handle(command)
+        finally:
+            self.events.stop()
+
+    def handle(self, command):
+        if command == NEXT:
+            return self.goTo(self.n + 1)
+        if command == PREVIOUS:
+            return self.goTo(self.n - 1)
+        if command == FIRST:
+            return self.goTo(self.pages.first())
+        if command == LAST:
+            return self.goTo(self.pages.last())
+        return False
+
+    def goTo(self, n):
+        # shows page n; out of range moves are ignored
+        try:
+            page = self.pages[n]
+        except IndexError:
+            return False
+        self.n = n
+        self.show(page)
+        return True
@@ -0,0 +1,179 @@
+import bisect
+import cells
+import louis
+from array import array
+
+# display pages that break at word boundaries, or at syllable boundaries for words longer
+# than a page, instead of every `width` cells
+# the document is translated once and the page index is built once; after that a page, the
+# page of a text offset and the page of a search hit are found without translating again
+# hyphenation patterns added to the translator's tables for syllable breaks, the translation
+# tables themselves usually have none
+hyphenation = [b'hyph_en_US.dic']
+# tables strings checked for hyphenate(), so a dictionary that can't be loaded is tried once
+# and not again for every long word of every document
+hyphenationUsable = {}
+
+def canHyphenate(tables):
+    key = b','.join(table.encode() if isinstance(table, str) else table for table in tables)
+    if key not in hyphenationUsable:
+        try:
+            louis.checkTable(tables)
+            hyphenationUsable[key] = True
+        except RuntimeError:
+            hyphenationUsable[key] = False
+    return hyphenationUsable[key]
+
+class PageIndex:
+    # a document's cells as dot masks, with the start and end cell of every page and the
+    # position maps between text and cells
+    # contracted uses translate() and its position maps, otherwise charToDots(), one cell per character
+    # hyphenTables are the tables for hyphenate(), the translator's own tables and hyphenation by default
+    # if they don't compile long words are cut at the page width, hyphenTables is then None
+    def __init__(self, translator, text, width, contracted=True, hyphenTables=None):
+        if width < 1:
+            raise ValueError('display width must be at least one cell')
+        self.translator = translator
+        self.text = text
+        self.width = width
+        self.contracted = contracted
+        if hyphenTables is None:
+            hyphenTables = list(translator.tableList) + hyphenation
+        self.hyphenTables = hyphenTables if canHyphenate(hyphenTables) else None
+        self.masks = bytearray()
+        # cell -> text offset and text offset -> cell, the latter with an entry for the end of the text
+        self.inPos = array('I')
+        self.outPos = array('I')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.build()
+        self.view = memoryview(self.masks)
+
+    def build(self):
+        # every line is translated on its own and starts a new page
+        offset = 0
+        for line in self.text.splitlines(True):
+            body = line.rstrip('\r\n')
+            if body:
+                self.addLine(body, offset)
+            # the line break maps to the cell after the line
+            self.outPos.extend([len(self.masks)] * (len(line) - len(body)))
+            offset += len(line)
+        self.outPos.append(len(self.masks))
+
+    def addLine(self, line, offset):
+        first = len(self.masks)
+        if self.contracted:
+            braille, inPos, outPos, _ = self.translator.translate(line)
+        else:
+            braille = self.translator.charToDots(line)
+            inPos = outPos = range(len(line))
+        masks = cells.toMasks(braille)
+        self.masks += masks
+        self.inPos.extend(offset + i for i in inPos)
+        self.outPos.extend(first + i for i in outPos)
+        self.paginate(masks, first)
+
+    def paginate(self, masks, first):
+        # greedy: each page takes as many whole words as fit, a word longer than a page is
+        # broken at the last syllable that fits, or at the page width if there is none
+        n = len(masks)
+        pos = 0
+        while True:
+            while pos < n and masks[pos] == 0:
+                pos += 1
+            if pos >= n:
+                return
+            end = pos + self.width
+            if end >= n:
+                cut = n
+            elif masks[end] == 0:
+                cut = end
+            else:
+                cut = masks.rfind(b'\0', pos, end)
+                if cut <= pos:
+                    cut = self.syllableBreak(first + pos, first + end) - first
+            pageEnd = cut
+            while masks[pageEnd - 1] == 0:
+                pageEnd -= 1
+            self.starts.append(first + pos)
+            self.ends.append(first + pageEnd)
+            pos = cut
+
+    def syllableBreak(self, start, end):
+        # the last cell in (start, end] where a syllable of the word at cell end begins and
+        # that isn't inside a contraction, end itself if there is none
+        if self.hyphenTables is None:
+            return end
+        text = self.text
+        # the whole word, also when it began on an earlier page
+        wordStart = self.inPos[start]
+        while wordStart > 0 and not text[wordStart - 1].isspace():
+            wordStart -= 1
+        wordEnd = self.inPos[end]
+        while wordEnd < len(text) and not text[wordEnd].isspace():
+            wordEnd += 1
+        try:
+            syllables = louis.hyphenate(self.hyphenTables, text[wordStart:wordEnd])
+        except RuntimeError:
+            # the tables compile, so liblouis rejected this word, e.g. an overlong token, it is
+            # cut at the page width
+            return end
+        for i in range(len(syllables) - 1, 0, -1):
+            if syllables[i] != '1':
+                continue
+            cell = self.outPos[wordStart + i]
+            if start < cell <= end and self.inPos[cell] == wordStart + i and self.inPos[cell - 1] < wordStart + i:
+                return cell
+        return end
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, n):
+        if n < 0:
+            n = n + len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+        return self.view[self.starts[n]:self.ends[n]]
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def cellCount(self):
+        return len(self.masks)
+
+    def pageCells(self, n):
+        # a page as a string of Unicode braille, for printing
+        return cells.fromMasks(self[n])
+
+    def pageForCell(self, cell):
+        # the page showing cell, or the page before it for blank cells between pages
+        return max(0, bisect.bisect_right(self.starts, cell) - 1)
+
+    def pageForOffset(self, offset):
+        # the page showing the character at text offset
+        offset = min(max(offset, 0), len(self.text))
+        return self.pageForCell(self.outPos[offset])
+
+    def textOffset(self, n):
+        # text offset of the first character on page n
+        return self.inPos[self.starts[n]]
+
+    def search(self, query, startPage=None, ignoreCase=False):
+        # the first page after startPage with a match of query, wrapping around to the start
+        # of the document, None if nothing matches; without startPage from the start
+        if not query or not len(self):
+            return None
+        text = self.text
+        if ignoreCase:
+            text = text.lower()
+            query = query.lower()
+        offset = 0 if startPage is None else self.inPos[self.ends[startPage] - 1] + 1
+        hit = text.find(query, offset)
+        if hit < 0:
+            hit = text.find(query)
+        if hit < 0:
+            return None
+        return self.pageForOffset(hit)
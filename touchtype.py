@@ -1,39 +1,192 @@
-import keyboard
+import cells
+import display
 import louis
+import metrics
+import navigation
+import pagination
 import sys
+import threading
 
-def init():
-    louis.checkTable([b'./en-ueb-g2.ctb'])
+tables = [b'./en-ueb-g2.ctb']
+# ucBrl (64) combined with noUndefined (128)
+mode = louis.ucBrl | louis.noUndefined
+translator = None
+# the tables are compiled on this thread while the input is read, see tablesReady()
+compiling = None
+compileError = None
+# number of cells on the display
+dispSize = 10
+# display backend by name, see display.backends
+displayName = 'terminal'
+frames = None
+# most characters read from stdin at a time in streaming mode
+blockSize = 4096
+# line breaks are shown as an empty cell
+blankCell = '\u2800'
+# pages translated ahead of the one being read in streaming mode, and kept after it
+readAhead = 4
+# where to write timings and counters on exit, .prom for Prometheus text format, JSON otherwise
+metricsFile = None
+# grade 2 translation with translate() instead of one cell per character with charToDots()
+contracted = False
+# where key events come from, replaced by a fake keyboard when replaying traces
+keyEvents = navigation.KeyboardEvents
+# document compiled with document.py to show instead of reading stdin
+documentFile = None
+
+def init(translate=True):
+    # checks and compiles the tables once, so the first keystroke doesn't pay for it
+    # that happens in the background while stdin is read, loading liblouis on the way
+    # a compiled document is shown without translating, it only needs the display
+    global compiling, frames
+    with metrics.stage('init'):
+        if translate:
+            compiling = threading.Thread(target=compileTables, daemon=True)
+            compiling.start()
+        frames = display.FrameWriter(display.create(displayName, dispSize))
     print('Initialized')
 
+def compileTables():
+    global translator, compileError
+    try:
+        with metrics.stage('compile'):
+            translator = louis.Translator(tables, mode=mode)
+    except Exception as e:
+        # kept for tablesReady(), a loading error (OSError for a missing liblouis) too,
+        # instead of ending the thread with only a traceback
+        compileError = e
+
+def tablesReady():
+    # waits for the tables compiled by init(), raising what compiling them raised
+    global compiling
+    if compiling is not None:
+        compiling.join()
+        compiling = None
+    if compileError is not None:
+        raise compileError
+
 def input():
-    input = sys.stdin.readlines()
+    # joined into one string, so the list repr (brackets, quotes, escapes) isn't translated
+    with metrics.stage('read'):
+        input = ''.join(sys.stdin.readlines())
     translate(input)
 
+def openDocument(path):
+    # pages are read from the memory-mapped file as they are shown, nothing is translated
+    # imported here, only opening a compiled document needs it
+    import document
+    with metrics.stage('open'):
+        pages = document.CompiledDocument(path)
+        if not pages.matches(tables, mode, dispSize, contracted):
+            sys.exit('%s was compiled for other tables or settings, rebuild it with document.py' % path)
+    printChunks(pages)
+
+def streamInput():
+    # translates stdin piece by piece as it arrives, without waiting for EOF
+    printStream(streamChunks(translateStream(readBlocks(sys.stdin))))
+
+def readBlocks(stream, size=blockSize):
+    # yields one line at a time, split into pieces of at most size characters
+    def read():
+        with metrics.stage('read'):
+            return stream.readline(size)
+    return iter(read, '')
+
+def translateStream(pieces):
+    # charToDots maps every character on its own, so pieces can be translated independently
+    for piece in pieces:
+        # the first piece is read while the tables compile
+        tablesReady()
+        text = piece.rstrip('\n')
+        if text:
+            with metrics.stage('translate'):
+                dots = translator.charToDots(text)
+            yield dots
+        if len(text) < len(piece):
+            yield blankCell
+
 def translate(input):
     print('Translating')
-    # prints the value of something and combines the ucBrl (64) and noUndefined (128) modes. Outputs as a single word, so a list is necessary to grab individual characters
-    dotList = list(louis.charToDots([b'./en-ueb-g2.ctb'],input,mode=192))
+    pages = paginate(input)
     print('Heres the whole thing:')
-    print(dotList)
-    dispSize = 10
-    chunked = list(divide_chunks(dotList, dispSize))
-    print(chunked)
-    printChunks(chunked)
+    print(cells.fromMasks(pages.masks))
+    printChunks(pages)
+
+def paginate(input):
+    # pages break at words, or at syllables of words longer than the display, with the
+    # hyphenation dictionary pagination adds to the tables
+    tablesReady()
+    with metrics.stage('translate'):
+        return pagination.PageIndex(translator, input, dispSize, contracted)
 
-def divide_chunks(list, number):
-    for i in range(0, len(list), number):
-        yield list[i:i + number]
+def streamChunks(pieces, number=dispSize):
+    # regroups a stream of cell strings into display sized chunks, holding at most one piece
+    pending = ''
+    for piece in pieces:
+        pending += piece
+        end = len(pending) - len(pending) % number
+        for i in range(0, end, number):
+            yield list(pending[i:i + number])
+        pending = pending[end:]
+    if pending:
+        yield list(pending)
 
 def printChunks(chunks):
-    n = 0
-    print(chunks[n])
-    while n<=len(chunks):
-        if keyboard.is_pressed('n'):
-            print('Printing line of dots')
-            print(chunks[n])
-            n = n+1
+    # waits on key events instead of polling: n/p for next/previous page, home/end for first/last, q to quit
+    navigation.Navigator(chunks, printChunk, keyEvents()).run()
+
+def printChunk(chunk):
+    # pages of a PageIndex and read-ahead pages are dot masks, streamed chunks are lists of cells
+    # the frame writer only refreshes the cells that changed
+    with metrics.stage('display'):
+        if isinstance(chunk, (bytes, memoryview)):
+            ranges = frames.show(chunk)
+        else:
+            ranges = frames.showCells(''.join(chunk))
+    metrics.count('pages')
+    metrics.count('cells_written', sum(end - start for start, end in ranges))
+
+def formatChunk(chunk):
+    return cells.toMasks(''.join(chunk))
+
+def printStream(chunks):
+    # same navigation over a chunk generator, keeping only recent chunks for going back
+    # the next pages are translated in the background while the current one is read
+    pages = navigation.ReadAhead(navigation.StreamPages(chunks), readAhead, readAhead, formatChunk)
+    try:
+        navigation.Navigator(pages, printChunk, keyEvents()).run()
+    finally:
+        pages.close()
+        for name, value in pages.stats().items():
+            if name != 'hit_rate':
+                metrics.count('readahead.' + name, value)
+
+def enableMetrics():
+    # wraps louis only now, so there is no cost unless metrics were asked for
+    metrics.registry.enable()
+    metrics.registry.instrumentLouis()
+    metrics.registry.captureLouisLog(louis.LOG_WARN)
 
 if __name__ == '__main__':
-    init()
-    input()
+    for arg in sys.argv[1:]:
+        if arg.startswith('--display='):
+            displayName = arg[len('--display='):]
+        if arg.startswith('--metrics='):
+            metricsFile = arg[len('--metrics='):]
+        if arg.startswith('--open='):
+            documentFile = arg[len('--open='):]
+        if arg == '--contracted':
+            contracted = True
+    if metricsFile:
+        enableMetrics()
+    try:
+        init(documentFile is None)
+        if documentFile:
+            openDocument(documentFile)
+        elif '--stream' in sys.argv[1:]:
+            streamInput()
+        else:
+            input()
+    finally:
+        if metricsFile:
+            metrics.registry.write(metricsFile)